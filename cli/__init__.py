@@ -1,11 +1,20 @@
 import os
+import sys
 from dotenv import load_dotenv
 import click
-from .commands.apps import apps
-from .commands.publishers import publishers
-from .commands.versions import versions
-from .commands.extendables import extendables
-from .commands.services import services
+from .agent import forward
+from .cache import DEFAULT_MAX_BYTES, ResponseCache
+from .lazy_group import LazyGroup
+from .output import OUTPUT_FORMATS
+from .ratelimit import parse_rate_limits
+from .trace import Tracer
+from .retry import (
+    DEFAULT_BASE_DELAY,
+    DEFAULT_MAX_DELAY,
+    DEFAULT_MAX_RETRIES,
+    RetryPolicy,
+)
+from .utils import DEFAULT_POOL_SIZE, register_sessions
 
 load_dotenv()
 
@@ -16,7 +25,17 @@ ENVIRONMENTS = {
 }
 
 
-@click.group()
+@click.group(
+    cls=LazyGroup,
+    lazy_subcommands={
+        "agent": "cli.commands.agent:agent",
+        "apps": "cli.commands.apps:apps",
+        "batch": "cli.commands.batch:batch",
+        "cache": "cli.commands.cache:cache",
+        "diff": "cli.commands.diff:diff",
+        "mirror": "cli.commands.mirror:mirror",
+    },
+)
 @click.option(
     "--env",
     type=click.Choice(["stage", "local", "prod"]),
@@ -29,17 +48,146 @@ ENVIRONMENTS = {
     required=False,
     envvar="PEEK_API_TOKEN",
 )
+@click.option(
+    "--pool-size",
+    type=click.IntRange(min=1),
+    default=DEFAULT_POOL_SIZE,
+    show_default=True,
+    envvar="PEEK_POOL_SIZE",
+    help="Maximum number of pooled keep-alive connections per host",
+)
+@click.option(
+    "--cache/--no-cache",
+    default=False,
+    envvar="PEEK_CACHE",
+    help="Revalidate list responses against the on-disk cache (ETag/Last-Modified)",
+)
+@click.option(
+    "--cache-ttl",
+    type=click.IntRange(min=0),
+    default=0,
+    envvar="PEEK_CACHE_TTL",
+    help="Serve cached list responses younger than this many seconds without "
+    "contacting the server (implies --cache)",
+)
+@click.option(
+    "--cache-max-bytes",
+    type=click.IntRange(min=0),
+    default=DEFAULT_MAX_BYTES,
+    show_default=True,
+    envvar="PEEK_CACHE_MAX_BYTES",
+    help="Size limit of the response cache; least recently used entries are evicted",
+)
+@click.option(
+    "--timeout",
+    type=click.FloatRange(min=0, min_open=True),
+    default=30.0,
+    show_default=True,
+    envvar="PEEK_TIMEOUT",
+    help="Seconds to wait for the server to connect or respond",
+)
+@click.option(
+    "--max-retries",
+    type=click.IntRange(min=0),
+    default=DEFAULT_MAX_RETRIES,
+    show_default=True,
+    envvar="PEEK_MAX_RETRIES",
+    help="Retries for connection errors, timeouts, 429 and 5xx responses "
+    "(idempotent requests only)",
+)
+@click.option(
+    "--retry-base-delay",
+    type=click.FloatRange(min=0),
+    default=DEFAULT_BASE_DELAY,
+    show_default=True,
+    help="Base of the exponential backoff between retries, in seconds",
+)
+@click.option(
+    "--retry-max-delay",
+    type=click.FloatRange(min=0),
+    default=DEFAULT_MAX_DELAY,
+    show_default=True,
+    help="Upper bound of the wait between retries, including a server's "
+    "Retry-After, in seconds",
+)
+@click.option(
+    "--rate-limit",
+    "rate_limits",
+    multiple=True,
+    callback=parse_rate_limits,
+    metavar="TARGET=RATE",
+    envvar="PEEK_RATE_LIMITS",
+    help="Requests per second allowed to TARGET (registry, run or build), "
+    "shared by all concurrent requests; lowered automatically on 429 or "
+    "ResourceExhausted and recovered afterwards. Repeatable, or several "
+    "pairs separated by commas (PEEK_RATE_LIMITS also takes spaces)",
+)
+@click.option(
+    "-v", "--verbose", is_flag=True, help="Report retries and other diagnostics"
+)
+@click.option(
+    "--output",
+    type=click.Choice(OUTPUT_FORMATS),
+    default="json",
+    show_default=True,
+    envvar="PEEK_OUTPUT",
+    help="Format of list output: pretty JSON, one record per line streamed as it "
+    "arrives, the response bytes unchanged, or a table",
+)
+@click.option(
+    "--trace",
+    "trace_path",
+    type=click.Path(dir_okay=False, writable=True),
+    envvar="PEEK_TRACE",
+    help="Append per-request timings (HTTP and GCP calls) to FILE as JSON lines",
+)
 @click.pass_context
-def cli(ctx, env, api_token):
+def cli(
+    ctx,
+    env,
+    api_token,
+    pool_size,
+    cache,
+    cache_ttl,
+    cache_max_bytes,
+    timeout,
+    max_retries,
+    retry_base_delay,
+    retry_max_delay,
+    rate_limits,
+    verbose,
+    output,
+    trace_path,
+):
     """CLI for interacting with the Peek API."""
     ctx.ensure_object(dict)
     ctx.obj["BASE_URL"] = ENVIRONMENTS[env]
     ctx.obj["ENV"] = env
     ctx.obj["PEEK_API_TOKEN"] = api_token
+    ctx.obj["POOL_SIZE"] = pool_size
+    ctx.obj["CACHE_TTL"] = cache_ttl
+    ctx.obj["CACHE"] = (
+        ResponseCache(max_bytes=cache_max_bytes) if cache or cache_ttl else None
+    )
+    ctx.obj["TIMEOUT"] = timeout
+    ctx.obj["RETRY_POLICY"] = RetryPolicy(
+        max_retries=max_retries,
+        base_delay=retry_base_delay,
+        max_delay=retry_max_delay,
+    )
+    ctx.obj["RATE_LIMITS"] = rate_limits
+    ctx.obj["VERBOSE"] = verbose
+    ctx.obj["OUTPUT"] = output
+    if trace_path:
+        tracer = Tracer(open(trace_path, "a"))
+        ctx.obj["TRACER"] = tracer
+        ctx.call_on_close(tracer.close)
+    register_sessions(ctx)
 
 
-cli.add_command(apps)
-apps.add_command(publishers)
-apps.add_command(versions)
-apps.add_command(extendables)
-apps.add_command(services)
+def main():
+    """Entry point of the ``peek`` script; uses the agent when one is running."""
+    exit_code = forward(sys.argv[1:])
+    if exit_code is None:
+        cli()
+    sys.exit(exit_code)
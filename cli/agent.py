@@ -0,0 +1,291 @@
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+from collections import deque
+from .batch import captured_streams, run_command
+from .cache import cache_dir
+from .trace import Tracer
+from .utils import close_sessions
+
+# Seconds without a command after which the agent exits
+DEFAULT_IDLE_TIMEOUT = 900
+
+# Commands that manage the agent or read the caller's stdin always run locally
+LOCAL_COMMANDS = {"agent", "batch"}
+
+# Commands that may open an editor or ask for confirmation, which needs the
+# caller's terminal and stdin; each maps to the flag that skips its prompt
+INTERACTIVE_COMMANDS = {
+    ("apps", "versions", "edit"): None,
+    ("apps", "extendables", "new"): None,
+    ("apps", "services", "delete"): "--force",
+}
+
+# Environment variables read by commands (as option envvars, by os.getenv or
+# by the Google auth libraries); the agent only serves callers that match it
+COMMAND_ENV_PREFIXES = ("PEEK_", "GOOGLE_", "GCP_", "CLOUDSDK_", "ADMIN_BASIC_AUTH_")
+COMMAND_ENV_NAMES = {"HOME", "XDG_CACHE_HOME", "XDG_CONFIG_HOME"}
+
+# Latencies kept for the percentiles shown by ``peek agent status``
+LATENCY_WINDOW = 1000
+
+
+def socket_path():
+    """Per-user socket path: PEEK_AGENT_SOCKET, else under XDG_RUNTIME_DIR."""
+    if os.getenv("PEEK_AGENT_SOCKET"):
+        return os.environ["PEEK_AGENT_SOCKET"]
+    base = os.getenv("XDG_RUNTIME_DIR") or cache_dir()
+    return os.path.join(base, "peek-cli", "agent.sock")
+
+
+def command_env(environ=None):
+    """Environment variables that change how a command runs.
+
+    The agent only runs commands for callers whose values match its own, since
+    options read them from the agent's environment, not the caller's.
+    """
+    environ = os.environ if environ is None else environ
+    return {
+        name: value
+        for name, value in environ.items()
+        if name.startswith(COMMAND_ENV_PREFIXES)
+        or name.endswith("_URL")
+        or name in COMMAND_ENV_NAMES
+    }
+
+
+def reads_stdin(args):
+    """Whether an argument of the command line is ``-``, i.e. may read stdin.
+
+    The agent's stdin is not the caller's, so such commands run locally
+    (``-`` for stdout, e.g. ``--report -``, is harmlessly treated the same).
+    """
+    return any(arg == "-" or arg.endswith("=-") for arg in args)
+
+
+def interactive(args):
+    """Whether the command line may prompt (see ``INTERACTIVE_COMMANDS``)."""
+    for path, skip_flag in INTERACTIVE_COMMANDS.items():
+        starts = [i for i, arg in enumerate(args) if arg == path[0]]
+        if any(tuple(args[i : i + len(path)]) == path for i in starts):
+            if skip_flag is None or skip_flag not in args:
+                return True
+    return False
+
+
+def request(message, path=None, timeout=None):
+    """Send one message to the agent and return its reply."""
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.settimeout(1.0)
+        client.connect(path or socket_path())
+        client.settimeout(timeout)
+        client.sendall(json.dumps(message).encode() + b"\n")
+        with client.makefile("rb") as reply:
+            return json.loads(reply.readline())
+    finally:
+        client.close()
+
+
+def forward(args):
+    """Run ``args`` on the agent and return the exit code.
+
+    Returns None when the command should run in this process instead: no agent
+    is listening, the command is local, reads stdin or may prompt (even when
+    stdin is piped), or the agent's working directory or environment differ
+    from ours.
+    """
+    if os.getenv("PEEK_NO_AGENT") or LOCAL_COMMANDS.intersection(args):
+        return None
+    if reads_stdin(args) or interactive(args) or sys.stdin.isatty():
+        return None
+    if not os.path.exists(socket_path()):
+        return None
+    message = {
+        "op": "run",
+        "args": args,
+        "cwd": os.getcwd(),
+        "env": command_env(),
+    }
+    try:
+        reply = request(message)
+    except (OSError, ValueError):
+        return None
+    if reply.get("fallback"):
+        return None
+    sys.stdout.write(reply["stdout"])
+    sys.stdout.flush()
+    sys.stderr.write(reply["stderr"])
+    return reply["exit_code"]
+
+
+class AgentStats:
+    """Counters shown by ``peek agent status``.
+
+    Commands run with a ``Tracer`` writing into this object, so HTTP and cache
+    events are counted from the same records ``--trace`` writes.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.commands = 0
+        self.failed = 0
+        self.fallbacks = 0
+        self.http = 0
+        self.reused = 0
+        self.cache = {"hit": 0, "revalidated": 0, "miss": 0}
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+
+    def write(self, line):
+        event = json.loads(line)
+        with self._lock:
+            if event["type"] == "http":
+                self.http += 1
+                if not event.get("connect_ms"):
+                    self.reused += 1
+            elif event["type"] == "cache":
+                self.cache[event["result"]] += 1
+
+    def flush(self):
+        pass
+
+    def command_done(self, result):
+        with self._lock:
+            self.commands += 1
+            self.failed += bool(result["exit_code"])
+            self.latencies.append(result["duration_ms"])
+
+    def snapshot(self):
+        with self._lock:
+            latencies = sorted(self.latencies)
+            cached = sum(self.cache.values())
+            return {
+                "pid": os.getpid(),
+                "uptime_s": round(time.time() - self.started, 1),
+                "commands": self.commands,
+                "failed": self.failed,
+                "fallbacks": self.fallbacks,
+                "http_requests": self.http,
+                "connection_reuse": _ratio(self.reused, self.http),
+                "cache_hit_rate": _ratio(
+                    self.cache["hit"] + self.cache["revalidated"], cached
+                ),
+                "latency_ms": {
+                    f"p{p}": _percentile(latencies, p) for p in (50, 90, 99)
+                },
+            }
+
+
+def _ratio(part, whole):
+    return round(part / whole, 3) if whole else None
+
+
+def _percentile(values, p):
+    if not values:
+        return None
+    return values[min(len(values) - 1, round(p / 100 * (len(values) - 1)))]
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        if hasattr(socket, "SO_PEERCRED"):
+            creds = self.request.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, 12)
+            if int.from_bytes(creds[4:8], sys.byteorder) != os.getuid():
+                return
+        message = json.loads(self.rfile.readline())
+        reply = self.server.agent.handle(message)
+        self.wfile.write(json.dumps(reply).encode() + b"\n")
+
+
+class _Server(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+class Agent:
+    """Runs forwarded commands in one long-lived process.
+
+    Every command shares the agent's keep-alive sessions and the modules it
+    has already imported. The agent exits after ``idle_timeout`` seconds
+    without a command.
+    """
+
+    def __init__(self, command, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        self.command = command
+        self.idle_timeout = idle_timeout
+        self.cwd = os.getcwd()
+        self.env = command_env()
+        self.sessions = {}
+        self.stats = AgentStats()
+        self.server = None
+        self.active = 0
+        self.last_active = time.monotonic()
+        self._lock = threading.Lock()
+
+    def handle(self, message):
+        op = message.get("op")
+        if op == "status":
+            return {**self.stats.snapshot(), "idle_timeout_s": self.idle_timeout}
+        if op == "stop":
+            threading.Thread(target=self.server.shutdown).start()
+            return {"stopping": True}
+        if op != "run":
+            return {"error": f"unknown op {op!r}"}
+        if message.get("cwd") != self.cwd or message.get("env") != self.env:
+            with self.stats._lock:
+                self.stats.fallbacks += 1
+            return {"fallback": "working directory or environment differ"}
+
+        with self._lock:
+            self.active += 1
+        try:
+            obj = {"SESSIONS": self.sessions, "TRACER": Tracer(self.stats)}
+            result = run_command(self.command, message["args"], obj)
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.last_active = time.monotonic()
+        self.stats.command_done(result)
+        return result
+
+    def _watch_idle(self, stopped):
+        while not stopped.wait(min(self.idle_timeout, 5)):
+            with self._lock:
+                idle = time.monotonic() - self.last_active
+                if not self.active and idle >= self.idle_timeout:
+                    break
+        if not stopped.is_set():
+            self.server.shutdown()
+
+    def serve(self, path=None):
+        path = path or socket_path()
+        os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+        if os.path.exists(path):
+            try:
+                request({"op": "status"}, path)
+            except OSError:
+                os.unlink(path)  # left behind by an agent that died
+            else:
+                raise RuntimeError(f"An agent is already listening on {path}")
+
+        umask = os.umask(0o177)  # the socket is created readable by its owner only
+        try:
+            self.server = _Server(path, _Handler)
+        finally:
+            os.umask(umask)
+        self.server.agent = self
+        stopped = threading.Event()
+        threading.Thread(target=self._watch_idle, args=(stopped,), daemon=True).start()
+        try:
+            with captured_streams():
+                self.server.serve_forever()
+        finally:
+            stopped.set()
+            self.server.server_close()
+            close_sessions(self.sessions)
+            if os.path.exists(path):
+                os.unlink(path)
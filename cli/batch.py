@@ -0,0 +1,105 @@
+import io
+import shlex
+import sys
+import threading
+import time
+import click
+
+_local = threading.local()
+
+
+class _ThreadLocalStream:
+    """Stands in for ``sys.stdout``/``sys.stderr`` while commands run in threads.
+
+    Writes go to the buffer the current thread is capturing into, or to the
+    original stream for threads that are not running a command.
+    """
+
+    def __init__(self, stream, name):
+        self._stream = stream
+        self._name = name
+
+    def _target(self):
+        return getattr(_local, self._name, None) or self._stream
+
+    def write(self, text):
+        return self._target().write(text)
+
+    def flush(self):
+        self._target().flush()
+
+    @property
+    def buffer(self):
+        return self._target().buffer
+
+    def __getattr__(self, name):
+        return getattr(self._target(), name)
+
+
+class captured_streams:
+    """Route each thread's stdout/stderr to its own buffer inside the block."""
+
+    def __enter__(self):
+        self.saved = sys.stdout, sys.stderr
+        sys.stdout = _ThreadLocalStream(sys.stdout, "stdout")
+        sys.stderr = _ThreadLocalStream(sys.stderr, "stderr")
+        return self
+
+    def __exit__(self, *exc_info):
+        sys.stdout, sys.stderr = self.saved
+
+
+def parse_line(line):
+    """Arguments of one batch line, or None for blank lines and comments.
+
+    Raises ValueError for a line that can't be split (e.g. an unclosed quote).
+    """
+    args = shlex.split(line, comments=True)
+    if args and args[0] == "peek":
+        args = args[1:]
+    return args or None
+
+
+def failed_line(error):
+    """The result record of a line that could not be parsed."""
+    return {
+        "exit_code": 2,
+        "duration_ms": 0.0,
+        "stdout": "",
+        "stderr": f"Error: Invalid command line: {error}\n",
+    }
+
+
+def run_command(command, args, obj):
+    """Run one command line in this process and return its result record.
+
+    ``obj`` becomes the command's ``ctx.obj``; passing a shared ``SESSIONS``
+    registry in it keeps connections open across commands. Must be called
+    inside ``captured_streams``.
+    """
+    stdout = io.TextIOWrapper(io.BytesIO(), encoding="utf-8", write_through=True)
+    stderr = io.TextIOWrapper(io.BytesIO(), encoding="utf-8", write_through=True)
+    _local.stdout, _local.stderr = stdout, stderr
+    start = time.perf_counter()
+    try:
+        exit_code = command.main(args, prog_name="peek", standalone_mode=False, obj=obj)
+        exit_code = exit_code if isinstance(exit_code, int) else 0
+    except click.ClickException as e:
+        e.show(file=stderr)
+        exit_code = e.exit_code
+    except click.Abort:
+        stderr.write("Aborted!\n")
+        exit_code = 1
+    except SystemExit as e:
+        exit_code = e.code if isinstance(e.code, int) else 1
+    except Exception as e:
+        stderr.write(f"Error: {type(e).__name__}: {e}\n")
+        exit_code = 1
+    finally:
+        _local.stdout = _local.stderr = None
+    return {
+        "exit_code": exit_code,
+        "duration_ms": round((time.perf_counter() - start) * 1000, 3),
+        "stdout": stdout.buffer.getvalue().decode("utf-8", "replace"),
+        "stderr": stderr.buffer.getvalue().decode("utf-8", "replace"),
+    }
@@ -0,0 +1,19 @@
+"""Build options of generated Cloud Build triggers.
+
+Kept free of Google SDK imports so the ``services`` command options can use
+them at CLI import time; ``cli.gcp`` builds triggers from the same values.
+"""
+
+# Layer caching of generated build triggers; "none" keeps builds reproducible
+BUILD_CACHES = ["none", "registry", "kaniko"]
+DEFAULT_BUILD_CACHE = "none"
+DEFAULT_CACHE_TTL_HOURS = 168
+
+# Names of Cloud Build's BuildOptions.MachineType offered by --machine-type
+MACHINE_TYPES = [
+    "E2_MEDIUM",
+    "E2_HIGHCPU_8",
+    "E2_HIGHCPU_32",
+    "N1_HIGHCPU_8",
+    "N1_HIGHCPU_32",
+]
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import requests
+from requests.structures import CaseInsensitiveDict
+
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+
+# Only the headers needed to revalidate and to decode the body are stored.
+STORED_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+
+
+def cache_dir():
+    """Directory holding cached registry responses.
+
+    Defaults to ``$XDG_CACHE_HOME/peek-cli`` (``~/.cache/peek-cli``) and can be
+    overridden with ``PEEK_CACHE_DIR``.
+    """
+    if os.getenv("PEEK_CACHE_DIR"):
+        return os.getenv("PEEK_CACHE_DIR")
+    base = os.getenv("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(base, "peek-cli")
+
+
+def token_identity(token):
+    """A stable, non-reversible identifier for an API token."""
+    return hashlib.sha256((token or "").encode()).hexdigest()[:16]
+
+
+class ResponseCache:
+    """Size-bounded, LRU-evicted on-disk cache of GET responses.
+
+    Each entry is a ``<key>.json`` metadata file plus a ``<key>.body`` file with
+    the raw response bytes. The metadata file's mtime is the LRU clock.
+    """
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or cache_dir()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(env, url, token):
+        raw = f"{env}\n{url}\n{token_identity(token)}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _paths(self, key):
+        base = os.path.join(self.directory, key)
+        return base + ".json", base + ".body"
+
+    def get(self, key):
+        """Return ``(meta, body)`` for a cached entry, or ``None``."""
+        meta_path, body_path = self._paths(key)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        os.utime(meta_path)
+        return meta, body
+
+    def put(self, key, response):
+        """Store a successful response and evict old entries if over budget."""
+        os.makedirs(self.directory, exist_ok=True)
+        meta = {
+            "url": response.url,
+            "status": response.status_code,
+            "headers": {
+                name: response.headers[name]
+                for name in STORED_HEADERS
+                if name in response.headers
+            },
+            "stored_at": time.time(),
+        }
+        meta_path, body_path = self._paths(key)
+        _write_atomic(body_path, response.content)
+        _write_atomic(meta_path, json.dumps(meta).encode())
+        self._evict()
+
+    def refresh(self, key, meta):
+        """Mark an entry as freshly validated by the server."""
+        meta["stored_at"] = time.time()
+        _write_atomic(self._paths(key)[0], json.dumps(meta).encode())
+
+    def _entries(self):
+        """List ``(mtime, size, key)`` for every entry, oldest first."""
+        entries = []
+        if not os.path.isdir(self.directory):
+            return entries
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            key = name[: -len(".json")]
+            meta_path, body_path = self._paths(key)
+            try:
+                mtime = os.stat(meta_path).st_mtime
+                size = os.path.getsize(meta_path) + os.path.getsize(body_path)
+            except OSError:
+                continue
+            entries.append((mtime, size, key))
+        return sorted(entries)
+
+    def _evict(self):
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, key in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove(key)
+            total -= size
+
+    def _remove(self, key):
+        for path in self._paths(key):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def clear(self):
+        """Remove every entry, returning how many were removed."""
+        entries = self._entries()
+        for _, _, key in entries:
+            self._remove(key)
+        return len(entries)
+
+    def stats(self):
+        entries = self._entries()
+        return {
+            "directory": self.directory,
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+        }
+
+
+def cached_response(meta, body):
+    """Build a ``requests.Response`` from a cache entry."""
+    response = requests.Response()
+    response.status_code = meta["status"]
+    response.url = meta["url"]
+    response.headers = CaseInsensitiveDict(meta["headers"])
+    response._content = body
+    response._content_consumed = True
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    return response
+
+
+def _write_atomic(path, data):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
@@ -0,0 +1,112 @@
+import click
+import os
+import subprocess
+import sys
+import time
+from ..agent import DEFAULT_IDLE_TIMEOUT, Agent, request, socket_path
+
+
+@click.group()
+def agent():
+    """Commands for the background agent that keeps peek warm."""
+    pass
+
+
+def _status():
+    try:
+        return request({"op": "status"}, timeout=5)
+    except (OSError, ValueError):
+        return None
+
+
+@agent.command(name="start")
+@click.option(
+    "--idle-timeout",
+    type=click.IntRange(min=1),
+    default=DEFAULT_IDLE_TIMEOUT,
+    show_default=True,
+    help="Seconds without a command before the agent exits",
+)
+@click.option(
+    "--foreground", is_flag=True, help="Run the agent in this process until stopped"
+)
+@click.pass_context
+def start(ctx, idle_timeout, foreground):
+    """Start the agent; later peek commands are forwarded to it.
+
+    Commands are only forwarded from the directory and environment the agent
+    was started with, and not when stdin is a terminal or an argument is "-"
+    (stdin), nor for commands that may prompt.
+    """
+    if foreground:
+        try:
+            Agent(ctx.find_root().command, idle_timeout).serve()
+        except RuntimeError as e:
+            raise click.ClickException(str(e))
+        return
+
+    status = _status()
+    if status:
+        click.echo(f"Agent already running (pid {status['pid']}).")
+        return
+    path = socket_path()
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    # The child imports this package from wherever it is installed or checked
+    # out, not from the caller's working directory
+    package_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+    python_path = [os.path.abspath(package_root), os.getenv("PYTHONPATH")]
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, python_path))}
+    with open(os.path.join(os.path.dirname(path), "agent.log"), "ab") as log:
+        subprocess.Popen(
+            [sys.executable, "-c", "from cli import main; main()", "agent", "start"]
+            + ["--foreground", "--idle-timeout", str(idle_timeout)],
+            env=env,
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=log,
+            start_new_session=True,
+        )
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        status = _status()
+        if status:
+            click.echo(f"Agent started (pid {status['pid']}).")
+            return
+        time.sleep(0.1)
+    raise click.ClickException(f"Agent did not start; see {log.name}")
+
+
+@agent.command(name="stop")
+def stop():
+    """Stop the agent."""
+    try:
+        request({"op": "stop"}, timeout=5)
+    except (OSError, ValueError):
+        raise click.ClickException("Agent is not running")
+    click.echo("Agent stopped.")
+
+
+@agent.command(name="status")
+def status():
+    """Show the agent's hit rates and command latency percentiles."""
+    info = _status()
+    if info is None:
+        raise click.ClickException("Agent is not running")
+    latency = info["latency_ms"]
+    click.echo(f"PID: {info['pid']}")
+    click.echo(f"Uptime: {info['uptime_s']}s (idle timeout {info['idle_timeout_s']}s)")
+    click.echo(
+        f"Commands: {info['commands']} ({info['failed']} failed, "
+        f"{info['fallbacks']} run locally)"
+    )
+    click.echo(f"HTTP requests: {info['http_requests']}")
+    click.echo(f"Connection reuse: {_percent(info['connection_reuse'])}")
+    click.echo(f"Cache hit rate: {_percent(info['cache_hit_rate'])}")
+    click.echo(
+        f"Latency: p50 {latency['p50']}ms, p90 {latency['p90']}ms, "
+        f"p99 {latency['p99']}ms"
+    )
+
+
+def _percent(ratio):
+    return "n/a" if ratio is None else f"{ratio:.0%}"
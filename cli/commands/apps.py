@@ -1,27 +1,55 @@
 import click
+from ..lazy_group import LazyGroup
+from ..mirror import Mirror
+from ..filtering import server_params
+from ..output import echo_list
+from ..pagination import RecordsPage, iter_pages, list_options
 from ..utils import make_request
 import json
 
 
-@click.group()
+@click.group(
+    cls=LazyGroup,
+    lazy_subcommands={
+        "publishers": "cli.commands.publishers:publishers",
+        "versions": "cli.commands.versions:versions",
+        "extendables": "cli.commands.extendables:extendables",
+        "services": "cli.commands.services:services",
+    },
+)
 def apps():
     """Commands for managing apps."""
     pass
 
 
 @apps.command(name="list")
+@list_options
 @click.pass_context
-def list_apps(ctx):
+def list_apps(ctx, page_size, limit, prefetch, fields, where, from_mirror):
     """List all apps."""
     url = f"{ctx.obj['BASE_URL']}/app-registry/api/apps/"
-    response = make_request("GET", url)
-    click.echo(f"Apps: {json.dumps(response.json(), indent=4)}")
+    if from_mirror:
+        pages = [RecordsPage(Mirror(ctx.obj["ENV"], readonly=True).apps())]
+    else:
+        pages = iter_pages(
+            url,
+            page_size=page_size,
+            prefetch=prefetch,
+            params=server_params(fields, where),
+        )
+    echo_list(
+        "Apps", pages, columns=("id", "name"), limit=limit, fields=fields, where=where
+    )
 
 
 @apps.command(name="create")
 @click.option("--name", required=True, help="Name of the app")
+@click.option(
+    "--idempotency-key",
+    help="Key sent as Idempotency-Key so the request can be safely retried",
+)
 @click.pass_context
-def create(ctx, name):
+def create(ctx, name, idempotency_key):
     """Create a new app."""
     url = f"{ctx.obj['BASE_URL']}/app-registry/api/apps/"
     payload = {
@@ -30,5 +58,5 @@ def create(ctx, name):
         }
     }
 
-    response = make_request("POST", url, json=payload)
+    response = make_request("POST", url, json=payload, idempotency_key=idempotency_key)
     click.echo(f"App created successfully: {json.dumps(response.json(), indent=4)}")
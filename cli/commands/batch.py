@@ -0,0 +1,67 @@
+import click
+import json
+from ..batch import captured_streams, failed_line, parse_line, run_command
+from ..engine import RequestEngine
+from ..utils import close_sessions
+
+
+@click.command()
+@click.argument("file", type=click.File("r"), default="-")
+@click.option(
+    "--parallel",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Commands run at once",
+)
+@click.option(
+    "--fail-fast", is_flag=True, help="Stop starting new commands after a failure"
+)
+@click.pass_context
+def batch(ctx, file, parallel, fail_fast):
+    """Run one peek command line per line of FILE in this process.
+
+    Lines are complete command lines (a leading "peek" is optional; blank lines
+    and # comments are skipped). Global options given before "batch" (e.g.
+    --env, --api-token, --output) apply to every line, which may override them.
+    All commands share one set of keep-alive connections. One JSON result per
+    line, with its exit code, duration and output, is printed as each command
+    finishes.
+    """
+    lines = []
+    for number, line in enumerate(file, start=1):
+        try:
+            args = parse_line(line)
+        except ValueError as e:
+            # Reported as this line's failure; the other lines still run
+            args = e
+        if args:
+            lines.append((number, line.rstrip("\n"), args))
+    sessions = {}
+    root = ctx.find_root().command
+    global_args = ctx.meta.get("global_args", [])
+
+    def run(item):
+        number, line, args = item
+        if isinstance(args, ValueError):
+            return failed_line(args)
+        return run_command(root, global_args + args, {"SESSIONS": sessions})
+
+    failed = 0
+    try:
+        with captured_streams():
+            results = RequestEngine(parallel).map(run, lines)
+            for (number, line, _), result, _ in results:
+                click.echo(
+                    json.dumps({"line": number, "command": line, **result}),
+                )
+                if result["exit_code"]:
+                    failed += 1
+                    if fail_fast:
+                        results.close()
+                        break
+    finally:
+        close_sessions(sessions)
+
+    if failed:
+        raise click.ClickException(f"{failed} of {len(lines)} commands failed")
@@ -0,0 +1,26 @@
+import click
+from ..cache import ResponseCache
+
+
+@click.group()
+def cache():
+    """Commands for managing the local response cache."""
+    pass
+
+
+@cache.command(name="clear")
+@click.pass_context
+def clear(ctx):
+    """Remove all cached responses."""
+    removed = (ctx.obj.get("CACHE") or ResponseCache()).clear()
+    click.echo(f"Removed {removed} cached responses.")
+
+
+@cache.command(name="stats")
+@click.pass_context
+def stats(ctx):
+    """Show cache location and size."""
+    info = (ctx.obj.get("CACHE") or ResponseCache()).stats()
+    click.echo(f"Directory: {info['directory']}")
+    click.echo(f"Entries: {info['entries']}")
+    click.echo(f"Size: {info['bytes']} / {info['max_bytes']} bytes")
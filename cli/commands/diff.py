@@ -0,0 +1,201 @@
+import click
+import json
+import os
+from .. import ENVIRONMENTS
+from ..compare import canonical, compare
+from ..engine import RequestEngine
+from ..output import echo_ndjson, echo_table, iter_records, output_format
+from ..pagination import iter_pages
+
+
+@click.command()
+@click.option(
+    "--envs",
+    default="stage,prod",
+    show_default=True,
+    help="Two comma separated environments to compare",
+)
+@click.option(
+    "--app-id",
+    "app_ids",
+    multiple=True,
+    help="Only compare this app (its id in either environment); repeatable "
+    "(defaults to every app)",
+)
+@click.option(
+    "--match-by",
+    type=click.Choice(["name", "id"]),
+    default="name",
+    show_default=True,
+    help="Field pairing an app in one environment with the same app in the "
+    "other; ids are assigned per environment, so only use id for copies",
+)
+@click.option(
+    "--concurrency",
+    type=click.IntRange(min=1),
+    help="Version listings fetched at once (defaults to --pool-size)",
+)
+@click.option(
+    "--exit-code",
+    is_flag=True,
+    help="Exit with status 1 when the environments differ",
+)
+@click.pass_context
+def diff(ctx, envs, app_ids, match_by, concurrency, exit_code):
+    """Compare apps, versions and their extendables between two environments.
+
+    Each environment uses PEEK_API_TOKEN_<ENV> (e.g. PEEK_API_TOKEN_PROD) when
+    set, and --api-token otherwise. Only added, removed and changed items are
+    printed; changed ones with the paths that differ.
+    """
+    envs = [env.strip() for env in envs.split(",") if env.strip()]
+    if len(envs) != 2 or envs[0] == envs[1]:
+        raise click.BadParameter(
+            "expected two different environments", param_hint="--envs"
+        )
+    unknown = [env for env in envs if env not in ENVIRONMENTS]
+    if unknown:
+        raise click.BadParameter(
+            f"unknown environment {unknown[0]!r}", param_hint="--envs"
+        )
+    if output_format() == "raw":
+        raise click.UsageError("diff does not support raw output")
+
+    contexts = {env: env_context(ctx, env) for env in envs}
+
+    def in_env(env, fetch, *args):
+        # Requests made in here use that environment's URL and token
+        with contexts[env].scope(cleanup=False):
+            return fetch(contexts[env].obj["BASE_URL"], *args)
+
+    apps = {}
+    for env, records, error in RequestEngine(2).map(
+        lambda env: in_env(env, fetch_apps), envs
+    ):
+        if error:
+            raise click.ClickException(f"Failed to fetch {env}: {error}")
+        apps[env] = keyed(records, match_by, env)
+
+    selected = set(apps[envs[0]]) | set(apps[envs[1]])
+    if app_ids:
+        # An id names an app in one environment; match_by finds it in the other
+        selected = {
+            key
+            for env in envs
+            for key, app in apps[env].items()
+            if str(app.get("id")) in app_ids
+        }
+    listings = [(env, key) for env in envs for key in sorted(selected & set(apps[env]))]
+
+    snapshots = {
+        env: {
+            "apps": {
+                key: canonical(apps[env][key]) for key in selected & set(apps[env])
+            },
+            "versions": {},
+        }
+        for env in envs
+    }
+
+    def fetch_listing(listing):
+        env, key = listing
+        return in_env(env, fetch_versions, apps[env][key])
+
+    for (env, key), records, error in RequestEngine(concurrency).map(
+        fetch_listing, listings
+    ):
+        if error:
+            raise click.ClickException(f"Failed to fetch {env}: {error}")
+        for record in records:
+            version = record.get("display_version") or record.get("id")
+            snapshots[env]["versions"][f"{key}/{version}"] = canonical(record)
+    left, right = snapshots[envs[0]], snapshots[envs[1]]
+
+    items = [
+        {"kind": kind, "key": key, "change": change, "changes": changes}
+        for kind in ("apps", "versions")
+        for key, change, changes in compare(left[kind], right[kind])
+    ]
+    echo_diff(items, envs)
+    if exit_code and items:
+        ctx.exit(1)
+
+
+def env_context(ctx, env):
+    """A child of ``ctx`` whose requests go to ``env`` with that env's token."""
+    return click.Context(
+        ctx.command,
+        parent=ctx,
+        obj={
+            **ctx.obj,
+            "ENV": env,
+            "BASE_URL": ENVIRONMENTS[env],
+            "PEEK_API_TOKEN": os.getenv(f"PEEK_API_TOKEN_{env.upper()}")
+            or ctx.obj.get("PEEK_API_TOKEN"),
+        },
+    )
+
+
+def fetch_apps(base_url):
+    return list(iter_records(iter_pages(f"{base_url}/app-registry/api/apps/")))
+
+
+def fetch_versions(base_url, app):
+    url = f"{base_url}/app-registry/api/apps/{app['id']}/versions/"
+    return list(iter_records(iter_pages(url, prefetch=1)))
+
+
+def keyed(apps, match_by, env):
+    """``{key: app}`` by ``match_by``, which must be unique to pair apps."""
+    by_key = {}
+    for app in apps:
+        key = str(app.get(match_by))
+        if key in by_key:
+            hint = (
+                "; pair apps with --match-by id instead" if match_by == "name" else ""
+            )
+            raise click.ClickException(
+                f"More than one app in {env} has {match_by} {key!r}{hint}"
+            )
+        by_key[key] = app
+    return by_key
+
+
+def echo_diff(items, envs):
+    """Print diff items in the format chosen with ``--output``."""
+    for item in items:
+        item["changes"] = [
+            {"path": path, envs[0]: left, envs[1]: right}
+            for path, left, right in item["changes"]
+        ]
+        item["change"] = {
+            "added": f"only in {envs[1]}",
+            "removed": f"only in {envs[0]}",
+        }.get(item["change"], item["change"])
+
+    output = output_format()
+    if output == "ndjson":
+        echo_ndjson(items)
+    elif output == "table":
+        rows = []
+        for item in items:
+            for change in item["changes"] or [{}]:
+                rows.append(
+                    {
+                        "kind": item["kind"],
+                        "key": item["key"],
+                        "change": item["change"],
+                        "path": change.get("path", ""),
+                        envs[0]: _cell(change, envs[0]),
+                        envs[1]: _cell(change, envs[1]),
+                    }
+                )
+        echo_table(rows, ("kind", "key", "change", "path", envs[0], envs[1]))
+    else:
+        click.echo(f"Diff: {json.dumps(items, indent=4)}")
+
+
+def _cell(change, env):
+    if env not in change:
+        return ""
+    return json.dumps(change[env], separators=(",", ":"))
@@ -1,5 +1,11 @@
 import click
 import json
+from ..engine import RequestEngine
+from ..extendables_index import DEFAULT_MAX_AGE, ExtendablesIndex, complete_slugs
+from ..filtering import server_params
+from ..mirror import Mirror
+from ..output import echo_list
+from ..pagination import RecordsPage, iter_pages, list_options
 from ..utils import make_request
 
 
@@ -10,39 +16,102 @@ def extendables():
 
 
 @extendables.command(name="list")
+@list_options
 @click.pass_context
-def list_extendables(ctx):
+def list_extendables(ctx, page_size, limit, prefetch, fields, where, from_mirror):
     """List all extendables."""
     url = f"{ctx.obj['BASE_URL']}/app-registry/api/extendables/"
-    response = make_request("GET", url)
-    click.echo(f"Extendables: {json.dumps(response.json(), indent=4)}")
+    if from_mirror:
+        pages = [RecordsPage(Mirror(ctx.obj["ENV"], readonly=True).extendables())]
+    else:
+        pages = iter_pages(
+            url,
+            page_size=page_size,
+            prefetch=prefetch,
+            params=server_params(fields, where),
+        )
+    echo_list(
+        "Extendables",
+        pages,
+        columns=("slug", "name"),
+        limit=limit,
+        fields=fields,
+        where=where,
+    )
+
+
+@extendables.command(name="show")
+@click.option(
+    "--name",
+    required=True,
+    shell_complete=complete_slugs,
+    help="Name of the extendable (e.g. extendable@v1)",
+)
+@click.option(
+    "--refresh", is_flag=True, help="Revalidate the local extendables index first"
+)
+@click.pass_context
+def show(ctx, name, refresh):
+    """Show one extendable from the local catalogue index."""
+    index = ExtendablesIndex(ctx.obj["ENV"])
+    index.refresh(ctx.obj["BASE_URL"], max_age=0 if refresh else DEFAULT_MAX_AGE)
+    extendable = index.get(name)
+    if extendable is None:
+        raise click.ClickException(f"Extendable {name} not found")
+    click.echo(f"Extendable: {json.dumps(extendable, indent=4)}")
 
 
 @extendables.command(name="new")
 @click.option(
-    "--name", required=True, help="Name of the extendable (e.g. extendable@v1)"
+    "--name",
+    "names",
+    required=True,
+    multiple=True,
+    shell_complete=complete_slugs,
+    help="Name of the extendable (e.g. extendable@v1); repeat to add several",
 )
 @click.option("--app-id", required=True, help="ID of the app")
 @click.option("--version", required=True, help="Version to update")
+@click.option(
+    "--refresh", is_flag=True, help="Revalidate the local extendables index first"
+)
 @click.pass_context
-def new(ctx, name, app_id, version):
-    """Get a template for a new extendable configuration."""
-    url = f"{ctx.obj['BASE_URL']}/app-registry/api/extendables"
-    response = make_request("GET", url)
-    filtered_response = [
-        item for item in response.json()["data"] if item["slug"] == name
-    ]
-    if not filtered_response:
-        click.echo(f"Error: Extendable {name} not found")
-        return
-    new_extendable = filtered_response[0]
-    new_extendable["extendable_slug"] = new_extendable["slug"]
-    del new_extendable["slug"]
-
+def new(ctx, names, app_id, version, refresh):
+    """Get a template for new extendable configurations."""
     url = f"{ctx.obj['BASE_URL']}/app-registry/api/apps/{app_id}/versions/{version}/"
+    index = ExtendablesIndex(ctx.obj["ENV"])
+
+    # Refreshing the index and fetching the current version are independent,
+    # so do both at once
+    tasks = {
+        "index": lambda: index.refresh(
+            ctx.obj["BASE_URL"], max_age=0 if refresh else DEFAULT_MAX_AGE
+        ),
+        "version": lambda: make_request("GET", url),
+    }
+    results = {
+        key: (result, error)
+        for key, result, error in RequestEngine(2).map(lambda key: tasks[key](), tasks)
+    }
+    _, error = results["index"]
+    if error:
+        raise error
+
+    new_extendables = []
+    for name in names:
+        extendable = index.get(name)
+        if extendable is None:
+            click.echo(f"Error: Extendable {name} not found")
+            return
+        new_extendable = dict(extendable)
+        new_extendable["extendable_slug"] = new_extendable.pop("slug")
+        new_extendables.append(new_extendable)
 
     try:
-        current_version = make_request("GET", url).json()
+        response, error = results["version"]
+        if error:
+            raise error
+        current_version = response.json()
         current_version["app_version"] = current_version["data"]
         current_version["app_version"]["configured_extendables"] = [
             {
@@ -55,7 +124,7 @@ def new(ctx, name, app_id, version):
             del extendable["configuration"]["__type__"]
         del current_version["data"]
         del current_version["app_version"]["extendables"]
-        current_version["app_version"]["configured_extendables"].append(new_extendable)
+        current_version["app_version"]["configured_extendables"].extend(new_extendables)
         updated_version = json.dumps(current_version, indent=4)
     except Exception as e:
         raise click.ClickException(f"Error getting current version: {str(e)}")
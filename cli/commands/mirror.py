@@ -0,0 +1,73 @@
+import click
+import json
+import sqlite3
+from ..mirror import UNPUBLISHED_SQL, USES_EXTENDABLE_SQL, Mirror
+from ..output import echo_ndjson, echo_table, output_format
+
+
+@click.group()
+def mirror():
+    """Commands for the local SQLite mirror of the registry."""
+    pass
+
+
+@mirror.command(name="sync")
+@click.option(
+    "--concurrency",
+    type=click.IntRange(min=1),
+    help="Apps whose versions are fetched at once (defaults to --pool-size)",
+)
+@click.option(
+    "--full", is_flag=True, help="Refetch everything instead of only what changed"
+)
+@click.pass_context
+def sync(ctx, concurrency, full):
+    """Pull apps, versions and extendables into the local mirror."""
+    local = Mirror(ctx.obj["ENV"])
+    try:
+        counts = local.sync(ctx.obj["BASE_URL"], concurrency=concurrency, full=full)
+    finally:
+        local.close()
+    for table, changes in sorted(counts.counts.items()):
+        summary = ", ".join(f"{n} {change}" for change, n in changes.items())
+        click.echo(f"{table}: {summary}")
+    if not counts.changed:
+        click.echo("Mirror is up to date.")
+
+
+@mirror.command(name="query")
+@click.argument("sql", required=False)
+@click.option(
+    "--uses-extendable",
+    metavar="SLUG",
+    help="Versions whose configuration uses this extendable",
+)
+@click.option("--unpublished", is_flag=True, help="Versions that are not published")
+@click.pass_context
+def query(ctx, sql, uses_extendable, unpublished):
+    """Query the local mirror with SQL (read-only) or a canned question."""
+    if sum(map(bool, (sql, uses_extendable, unpublished))) != 1:
+        raise click.UsageError(
+            "Give exactly one of SQL, --uses-extendable or --unpublished"
+        )
+    params = ()
+    if uses_extendable:
+        sql, params = USES_EXTENDABLE_SQL, (uses_extendable,)
+    elif unpublished:
+        sql = UNPUBLISHED_SQL
+
+    local = Mirror(ctx.obj["ENV"], readonly=True)
+    try:
+        rows = local.query(sql, params)
+    except sqlite3.Error as e:
+        raise click.ClickException(f"Query failed: {e}")
+    finally:
+        local.close()
+
+    output = output_format()
+    if output == "ndjson":
+        echo_ndjson(rows)
+    elif output == "table":
+        echo_table(rows, list(rows[0]) if rows else [])
+    else:
+        click.echo(json.dumps(rows, indent=4))
@@ -1,17 +1,18 @@
 import click
 import os
-from google.cloud import run_v2
-from google.cloud.devtools import cloudbuild_v1
-from google.cloud.devtools.cloudbuild_v1.types import (
-    GitHubEventsConfig,
-    PushFilter,
-    BuildTrigger,
-    BuildStep,
+import time
+from ..build_options import (
+    BUILD_CACHES,
+    DEFAULT_BUILD_CACHE,
+    DEFAULT_CACHE_TTL_HOURS,
+    MACHINE_TYPES,
 )
-from google.cloud.run_v2.types import Container
-from google.auth import default
-from google.api_core import exceptions
-import google.api_core.exceptions
+from ..engine import RequestEngine
+from ..filtering import parse_labels
+from ..output import echo_ndjson, echo_table, output_format
+
+# The Google Cloud SDKs (and grpc) take hundreds of milliseconds to import, so
+# they are imported inside each command rather than at module level.
 
 
 @click.group()
@@ -20,184 +21,6 @@ def services():
     pass
 
 
-class IamPolicyManager:
-    """IAM policy manager enables unauthenticated access to Cloud Run services."""
-
-    def __init__(self, client):
-        self.client = client
-
-    def set_invoker_policy(self, resource_name):
-        policy_request = {
-            "resource": resource_name,
-            "policy": {
-                "bindings": [
-                    {
-                        "role": "roles/run.invoker",
-                        "members": ["allUsers"],
-                    }
-                ],
-                "version": 3,
-            },
-        }
-        return self.client.set_iam_policy(request=policy_request)
-
-
-class CloudBuildTriggerManager:
-    """Manages the creation of Cloud Build triggers."""
-
-    def __init__(self, credentials, project_id, region, owner, repo, service_account):
-        self.client = cloudbuild_v1.CloudBuildClient(credentials=credentials)
-        self.project_id = project_id
-        self.region = region
-        self.owner = owner
-        self.repo = repo
-        self.service_account = service_account
-
-    def create_build_trigger(self, name):
-        steps = [
-            BuildStep(
-                id="Build",
-                name="gcr.io/cloud-builders/docker",
-                args=[
-                    "build",
-                    "--no-cache",
-                    "-t",
-                    f"{self.region}-docker.pkg.dev/{self.project_id}/cloud-run-source-deploy/{self.owner}/{self.repo}:$COMMIT_SHA",
-                    ".",
-                    "-f",
-                    "Dockerfile",
-                ],
-            ),
-            BuildStep(
-                id="Push",
-                name="gcr.io/cloud-builders/docker",
-                args=[
-                    "push",
-                    f"{self.region}-docker.pkg.dev/{self.project_id}/cloud-run-source-deploy/{self.owner}/{self.repo}:$COMMIT_SHA",
-                ],
-            ),
-            BuildStep(
-                id="Deploy",
-                name="gcr.io/google.com/cloudsdktool/cloud-sdk:slim",
-                args=[
-                    "gcloud",
-                    "run",
-                    "deploy",
-                    name,
-                    f"--image={self.region}-docker.pkg.dev/{self.project_id}/cloud-run-source-deploy/{self.owner}/{self.repo}:$COMMIT_SHA",
-                    f"--labels=managed-by=gcp-cloud-build-deploy-cloud-run,commit-sha=$COMMIT_SHA,gcb-build-id=$BUILD_ID,peek-app-id={name}",
-                    f"--region={self.region}",
-                ],
-            ),
-        ]
-
-        trigger = BuildTrigger(
-            name=name,
-            github=GitHubEventsConfig(
-                owner=self.owner,
-                name=self.repo,
-                push=PushFilter(branch="main"),
-            ),
-            # Gotta have this or API call will fail with invalid argument
-            service_account=self.service_account,
-            substitutions={
-                "_SERVICE_NAME": name,
-                "_DEPLOY_REGION": self.region,
-                "_AR_HOSTNAME": f"{self.region}-docker.pkg.dev",
-                "_PLATFORM": "managed",
-            },
-        )
-        trigger.autodetect = True
-        trigger.build = cloudbuild_v1.Build(
-            steps=steps,
-            # Need this or API call will fail
-            options=cloudbuild_v1.BuildOptions(
-                logging="CLOUD_LOGGING_ONLY",
-            ),
-        )
-
-        request = cloudbuild_v1.CreateBuildTriggerRequest(
-            project_id=self.project_id,
-            trigger=trigger,
-        )
-
-        try:
-            response = self.client.create_build_trigger(request=request)
-
-            request = cloudbuild_v1.RunBuildTriggerRequest(
-                project_id=self.project_id,
-                trigger_id=response.id,
-                source=cloudbuild_v1.RepoSource(
-                    branch_name="main",
-                ),
-            )
-
-            # Make the request to trigger the first build
-            operation = self.client.run_build_trigger(request=request)
-
-            print("Waiting for operation to complete...")
-            operation.result()
-
-            return response
-        except google.api_core.exceptions.AlreadyExists:
-            raise click.ClickException(f"Build trigger '{name}' already exists")
-        except google.api_core.exceptions.GoogleAPICallError as e:
-            raise click.ClickException(f"Failed to create build trigger: {str(e)}")
-
-
-class CloudRunServiceManager:
-    """Manages the creation of Cloud Run services."""
-
-    def __init__(self, credentials=None):
-        if credentials is None:
-            credentials, project_id = default()
-            region = os.getenv("GCP_REGION")
-            if not region:
-                raise click.ClickException("GCP_REGION is not set")
-
-        self.client = run_v2.ServicesClient(credentials=credentials)
-        self.parent = f"projects/{project_id}/locations/{region}"
-
-    def create_service(self, name, image=None):
-        containers = []
-        if image:
-            container = Container(image=image)
-            if name:
-                container.env = [run_v2.types.EnvVar(name="PEEK_APP_ID", value=name)]
-            containers.append(container)
-        else:
-            # uses a place holder image since you can't create a service without an image
-            # and we don't have an image yet because we haven't created and run the build trigger
-            # smells like a bug, but it works for now.
-            # we might revisit this and first create a build so that we have an image, then create a service, then create the build trigger
-            container = Container(
-                image="us-docker.pkg.dev/cloudrun/container/hello",
-            )
-            containers.append(container)
-
-        template = run_v2.RevisionTemplate(
-            containers=containers,
-        )
-
-        service = run_v2.Service(
-            template=template,
-            labels={"peek-app-id": name},
-        )
-
-        try:
-            operation = self.client.create_service(
-                parent=self.parent,
-                service=service,
-                service_id=name,
-            )
-
-            return operation.result()
-        except google.api_core.exceptions.AlreadyExists:
-            raise click.ClickException(f"Service '{name}' already exists")
-        except google.api_core.exceptions.GoogleAPICallError as e:
-            raise click.ClickException(f"Failed to create service: {str(e)}")
-
-
 @services.command(name="create")
 @click.option(
     "--repository",
@@ -205,40 +28,281 @@ class CloudRunServiceManager:
     required=True,
 )
 @click.option("--app-id", help="App ID to use for the service", required=True)
-def create_service(repository, app_id):
+@click.option(
+    "--no-wait",
+    is_flag=True,
+    help="Return once the service and first build are started, printing their "
+    "operations for 'services wait'",
+)
+@click.option(
+    "--logs/--no-logs",
+    default=True,
+    help="Tail the first build's log while waiting (step status is always shown)",
+)
+@click.option(
+    "--build-cache",
+    type=click.Choice(BUILD_CACHES),
+    default=DEFAULT_BUILD_CACHE,
+    show_default=True,
+    help="Docker layer caching of the generated trigger: rebuild every layer, "
+    "reuse the previous :latest image (--cache-from), or kaniko's cache repo",
+)
+@click.option(
+    "--build-cache-ttl",
+    type=click.IntRange(min=1),
+    default=DEFAULT_CACHE_TTL_HOURS,
+    show_default=True,
+    help="Hours kaniko keeps cached layers (with --build-cache kaniko)",
+)
+@click.option(
+    "--machine-type",
+    type=click.Choice(MACHINE_TYPES, case_sensitive=False),
+    help="Cloud Build machine type (default: Cloud Build's standard machine)",
+)
+@click.option(
+    "--ensure",
+    is_flag=True,
+    help="Check the existing service, IAM binding and trigger first and only "
+    "create or fix what is missing or different",
+)
+def create_service(
+    repository,
+    app_id,
+    no_wait,
+    logs,
+    build_cache,
+    build_cache_ttl,
+    machine_type,
+    ensure,
+):
     """Create a service from a GitHub repo and enable autodeploy."""
-    credentials, default_project = default()
-    project_id = default_project
+    from google.api_core import exceptions
+    from ..gcp import (
+        BuildTail,
+        CloudBuildTriggerManager,
+        CloudRunServiceManager,
+        IamPolicyManager,
+        get_clients,
+        operation_name,
+        wait_operations,
+    )
 
+    clients = get_clients()
     owner = repository.split("/")[0]
     repo = repository.split("/")[1]
     name = app_id.replace("_", "-") + "-" + repo
     service_account = os.getenv("GCP_SERVICE_ACCOUNT")
-    region = os.getenv("GCP_REGION")
 
     if not service_account:
         raise click.ClickException("GCP_SERVICE_ACCOUNT is not set")
 
-    if not region:
-        raise click.ClickException("GCP_REGION is not set")
-
-    # Create service without initial image
-    service_manager = CloudRunServiceManager()
-    service_response = service_manager.create_service(name)
-
-    # Set IAM policy to enable unauthenticated access to the service via http
-    IamPolicyManager(service_manager.client).set_invoker_policy(service_response.name)
-
-    # Create build trigger to autodeploy from GitHub
+    service_manager = CloudRunServiceManager(clients)
     build_trigger_manager = CloudBuildTriggerManager(
-        credentials, project_id, region, owner, repo, service_account
+        clients, owner, repo, service_account
+    )
+    iam = IamPolicyManager(service_manager.client)
+    desired_trigger = build_trigger_manager.build_trigger(
+        name,
+        build_cache=build_cache,
+        cache_ttl=build_cache_ttl,
+        machine_type=machine_type and machine_type.upper(),
     )
-    build_trigger_manager.create_build_trigger(name)
 
-    click.echo(f"Build completed successfully!")
-    click.echo("\nService created successfully:")
+    existing = {"service": None, "iam": False, "trigger": None}
+    if ensure:
+        # The three lookups are independent, so they run together
+        checks = {
+            "service": lambda: service_manager.get_service(name),
+            "iam": lambda: iam.has_invoker_policy(service_manager.service_name(name)),
+            "trigger": lambda: build_trigger_manager.get_build_trigger(name),
+        }
+        for label, found, error in RequestEngine(3).map(lambda c: checks[c](), checks):
+            if error:
+                raise click.ClickException(f"Failed to check {label}: {error}")
+            existing[label] = found
+
+    service = existing["service"]
+    trigger = existing["trigger"]
+    # A service still running the placeholder image has never been built
+    image_current = service is not None and any(
+        container.image.startswith(f"{build_trigger_manager.image}:")
+        for container in service.template.containers
+    )
+    plan = {
+        "service": "exists" if service else "create",
+        "iam": "exists" if existing["iam"] else "grant",
+        "trigger": (
+            "create"
+            if trigger is None
+            else (
+                "update"
+                if build_trigger_manager.drifted(trigger, desired_trigger)
+                else "exists"
+            )
+        ),
+    }
+    plan["build"] = "skip" if plan["trigger"] == "exists" and image_current else "run"
+    if ensure:
+        for label, action in plan.items():
+            click.echo(f"{label.capitalize()}: {action}", err=True)
+
+    iam_pending = []
+
+    def grant_access():
+        # The service resource exists once creation is accepted, so public
+        # access is granted now instead of after it becomes ready
+        try:
+            iam.set_invoker_policy(service_manager.service_name(name))
+        except (exceptions.NotFound, exceptions.FailedPrecondition):
+            iam_pending.append(name)
+
+    def start_service():
+        # Create service without initial image
+        operation = service_manager.start_create_service(name)
+        if plan["iam"] == "grant":
+            grant_access()
+        return operation
+
+    def start_build():
+        # Create build trigger to autodeploy from GitHub, then build main once
+        current = trigger
+        if plan["trigger"] == "create":
+            current = build_trigger_manager.create_build_trigger(
+                name,
+                build_cache=build_cache,
+                cache_ttl=build_cache_ttl,
+                machine_type=machine_type and machine_type.upper(),
+            )
+        elif plan["trigger"] == "update":
+            current = build_trigger_manager.update_build_trigger(
+                trigger, desired_trigger
+            )
+        if plan["build"] == "run":
+            return build_trigger_manager.run_build_trigger(current.id)
+
+    # Service creation and the trigger/build are independent of each other
+    steps = {"build": start_build}
+    if plan["service"] == "create":
+        steps["service"] = start_service
+    elif plan["iam"] == "grant":
+        steps["iam"] = grant_access
+    operations = {}
+    errors = []
+    for label, operation, error in RequestEngine(len(steps)).map(
+        lambda s: steps[s](), steps
+    ):
+        if error:
+            errors.append(error)
+        elif label in ("service", "build") and operation is not None:
+            operations[label] = operation
+
+    if no_wait or errors:
+        for label, operation in operations.items():
+            click.echo(f"{label.capitalize()} operation: {operation_name(operation)}")
+        # Access not granted yet is granted by 'services wait' once the service exists
+        grants = [service_manager.service_name(pending) for pending in iam_pending]
+        if operations:
+            names = " ".join(operation_name(op) for op in operations.values())
+            options = "".join(f" --grant-access {grant}" for grant in grants)
+            click.echo(f"Track with: peek apps services wait{options} {names}")
+        for grant in grants:
+            click.echo(
+                f"Warning: {grant} is not public yet, as it did not exist when "
+                "access was granted. 'services wait' above grants it, or run "
+                f"'peek apps services update-policy --name {grant}'",
+                err=True,
+            )
+        if errors:
+            if isinstance(errors[0], click.ClickException):
+                raise errors[0]
+            raise click.ClickException(f"Failed to create service: {errors[0]}")
+        return
+
+    results = {}
+    if "build" in operations:
+        # The build's steps and log are followed while both operations run
+        tail = BuildTail(clients, operations["build"].metadata.build.id, logs=logs)
+        results = wait_operations(operations, on_poll=tail.poll)
+        tail.poll()
+        echo_table(
+            [
+                {
+                    "step": step,
+                    "status": status,
+                    "seconds": "" if seconds is None else f"{seconds:.1f}",
+                }
+                for step, status, seconds in tail.summary()
+            ],
+            ("step", "status", "seconds"),
+        )
+    elif operations:
+        results = wait_operations(operations)
+
+    failed = [
+        f"{label}: {result['error']}"
+        for label, result in results.items()
+        if result["error"]
+    ]
+    if failed:
+        raise click.ClickException("Service creation failed:\n" + "\n".join(failed))
+
+    service_response = results["service"]["result"] if "service" in results else service
+    if iam_pending:
+        # Set IAM policy to enable unauthenticated access to the service via http
+        iam.set_invoker_policy(service_response.name)
+
+    if "build" in results:
+        click.echo(f"Build completed successfully!")
+    if "service" in results:
+        click.echo("\nService created successfully:")
+    else:
+        click.echo("\nService is up to date:")
     click.echo(f"Name: {service_response.name}")
     click.echo(f"URL: {service_response.uri}")
+    for label, result in results.items():
+        click.echo(f"{label.capitalize()} took {result['seconds']}s")
+
+
+@services.command(name="wait")
+@click.argument("operations", nargs=-1, required=True)
+@click.option(
+    "--grant-access",
+    "grants",
+    multiple=True,
+    metavar="SERVICE",
+    help="Full resource name of a service to make public once the operations "
+    "finish (printed by 'services create --no-wait'). Repeatable",
+)
+def wait(operations, grants):
+    """Wait for operations started with 'services create --no-wait'."""
+    from ..gcp import IamPolicyManager, OperationRef, get_clients, wait_operations
+
+    clients = get_clients()
+    results = wait_operations(
+        {name: OperationRef(clients, name) for name in operations}
+    )
+    failed = 0
+    for name, result in results.items():
+        if result["error"]:
+            failed += 1
+            click.echo(f"{name}: failed after {result['seconds']}s: {result['error']}")
+        else:
+            click.echo(f"{name}: done after {result['seconds']}s")
+    denied = 0
+    for grant in grants:
+        try:
+            IamPolicyManager(clients.run()).set_invoker_policy(grant)
+        except Exception as e:
+            denied += 1
+            click.echo(f"{grant}: failed to grant public access: {e}")
+        else:
+            click.echo(f"{grant}: public access granted")
+    if failed:
+        raise click.ClickException(f"{failed} of {len(results)} operations failed")
+    if denied:
+        raise click.ClickException(
+            f"Failed to grant public access to {denied} of {len(grants)} services"
+        )
 
 
 @services.command(name="deploy-image")
@@ -247,6 +311,8 @@ def create_service(repository, app_id):
 @click.option("--app-id", help="App ID to use for the service", required=True)
 def deploy_image(name, image, app_id):
     """Deploy an existing Docker image to Cloud Run."""
+    from ..gcp import CloudRunServiceManager, IamPolicyManager
+
     # Format service name according to Cloud Run requirements
     service_id = name.lower().replace(" ", "-")
 
@@ -264,95 +330,314 @@ def deploy_image(name, image, app_id):
     click.echo(f"URL: {service_response.uri}")
 
 
-@services.command(name="list")
-def list_services():
-    """List all Cloud Run services."""
-    try:
-        location = os.getenv("GCP_REGION")
-        credentials, default_project = default()
-        project_id = default_project
-
-        if not project_id:
-            raise click.ClickException(
-                "No project specified. Please provide --project or set GOOGLE_CLOUD_PROJECT environment variable"
-            )
-
-        client = run_v2.ServicesClient(credentials=credentials)
-        parent = f"projects/{project_id}/locations/{location}"
+@services.command(name="rollout")
+@click.option("--image", required=True, help="Image to deploy to every target")
+@click.option(
+    "--targets",
+    type=click.File("r"),
+    required=True,
+    help="File with one service name (or full resource name) per line; "
+    "- reads stdin",
+)
+@click.option(
+    "--parallel",
+    type=click.IntRange(min=1),
+    default=5,
+    show_default=True,
+    help="Services updated at once",
+)
+@click.option(
+    "--canary",
+    type=click.IntRange(min=0),
+    default=0,
+    show_default=True,
+    help="Update this many targets first; the rest only roll out if they all succeed",
+)
+@click.pass_context
+def rollout(ctx, image, targets, parallel, canary):
+    """Update many existing services to a new image concurrently."""
+    from ..gcp import CloudRunServiceManager, run_operations
+
+    names = _read_names(targets)
+    if not names:
+        raise click.UsageError("No targets given")
+    service_manager = CloudRunServiceManager()
 
-        try:
-            services = client.list_services(parent=parent)
-            click.echo(f"\nCloud Run services in {location}:")
-            for service in services:
-                click.echo(f"- {service.name} ({service.uid})")
-                click.echo(f"  URL: {service.uri}")
-                click.echo(f"  Created: {service.create_time}")
-                click.echo(f"  Updated: {service.update_time}")
-                click.echo("")
-
-        except exceptions.PermissionDenied:
-            raise click.ClickException(
-                f"Permission denied. Please ensure you have 'run.services.list' permission for project '{project_id}'\n"
-                "You can grant this permission by running:\n"
-                f"gcloud projects add-iam-policy-binding {project_id} "
-                "--member=user:<your-email> --role=roles/run.viewer"
-            )
-        except exceptions.NotFound:
-            raise click.ClickException(
-                f"Project '{project_id}' or location '{location}' not found"
+    def start(name):
+        return service_manager.start_update_image(name, image)
+
+    waves = [names[:canary], names[canary:]] if canary else [names]
+    results = {}
+    for number, wave in enumerate(waves):
+        if not wave:
+            continue
+        results.update(run_operations(start, wave, limit=parallel))
+        if any(results[name]["error"] for name in wave) and number < len(waves) - 1:
+            click.echo(
+                "Canary failed; not rolling out to the remaining services.", err=True
             )
+            break
 
-    except Exception as e:
-        raise click.ClickException(f"Failed to list services: {str(e)}")
+    rows = []
+    for name in names:
+        result = results.get(name)
+        if result is None:
+            status, seconds, error = "skipped", "", ""
+        else:
+            status = "failed" if result["error"] else "updated"
+            seconds, error = result["seconds"], result["error"] or ""
+        rows.append(
+            {"service": name, "status": status, "seconds": seconds, "error": str(error)}
+        )
+    if output_format() == "ndjson":
+        echo_ndjson(rows)
+    else:
+        echo_table(rows, ("service", "status", "seconds", "error"))
 
+    failed = sum(1 for row in rows if row["status"] != "updated")
+    if failed:
+        raise click.ClickException(f"{failed} of {len(rows)} services were not updated")
 
-@services.command(name="delete")
-@click.option("--name", help="Name of the service to delete", required=True)
-@click.option("--force", is_flag=True, help="Skip confirmation prompt")
-def delete_service(name, force):
-    """Delete a Cloud Run service."""
-    region = os.getenv("GCP_REGION")
-    credentials, default_project = default()
-    project_id = default_project
 
-    client = run_v2.ServicesClient(credentials=credentials)
+@services.command(name="list")
+@click.option(
+    "--project",
+    "projects",
+    multiple=True,
+    help="Project to list; repeatable (defaults to the credentials' project)",
+)
+@click.option(
+    "--region",
+    "regions",
+    multiple=True,
+    help="Region to list; repeatable, or 'all' (defaults to GCP_REGION)",
+)
+@click.option(
+    "--label",
+    "labels",
+    multiple=True,
+    callback=parse_labels,
+    metavar="KEY=VALUE",
+    help="Only services with this label, e.g. peek-app-id=123; repeatable",
+)
+@click.option(
+    "--page-size", type=click.IntRange(min=1), help="Services requested per page"
+)
+@click.option(
+    "--concurrency",
+    type=click.IntRange(min=1),
+    help="Listings fetched at once (defaults to --pool-size)",
+)
+def list_services(projects, regions, labels, page_size, concurrency):
+    """List Cloud Run services across projects and regions.
+
+    Every project/region listing is fetched concurrently and printed as it
+    arrives: as text by default, or with --output ndjson/table.
+    """
+    from google.api_core import exceptions
+    from ..gcp import get_clients, list_locations, list_services, service_record
+
+    clients = get_clients()
+    projects = projects or [clients.project_id]
+    unlisted = 0
+    if "all" in regions:
+        # Listings need a concrete region, so each project's regions come first
+        parents = []
+        engine = RequestEngine(concurrency)
+        for project, locations, error in engine.map(
+            lambda project: list_locations(clients, project), projects
+        ):
+            if error:
+                unlisted += 1
+                click.echo(
+                    f"Failed to list Cloud Run regions of project {project}: {error}",
+                    err=True,
+                )
+                continue
+            parents += [clients.parent(project, region) for region in locations]
+    else:
+        parents = [
+            clients.parent(project, region)
+            for project in projects
+            for region in regions or [clients.region]
+        ]
 
-    # Format service name according to Cloud Run requirements
-    service_id = name.lower().replace(" ", "-")
-    service_name = f"projects/{project_id}/locations/{region}/services/{service_id}"
+    def fetch(parent):
+        return list_services(clients, parent, page_size)
+
+    output = output_format()
+    rows = []
+    failed = 0
+    for parent, services, error in RequestEngine(concurrency).map(fetch, parents):
+        if error:
+            failed += 1
+            project_id = parent.split("/")[1]
+            if isinstance(error, exceptions.PermissionDenied):
+                error = (
+                    f"Permission denied. Please ensure you have 'run.services.list' permission for project '{project_id}'\n"
+                    "You can grant this permission by running:\n"
+                    f"gcloud projects add-iam-policy-binding {project_id} "
+                    "--member=user:<your-email> --role=roles/run.viewer"
+                )
+            elif isinstance(error, exceptions.NotFound):
+                error = f"Project or location not found: {parent}"
+            click.echo(f"Failed to list services in {parent}: {error}", err=True)
+            continue
+
+        # The v2 API has no list filter, so labels are matched here
+        services = [
+            service
+            for service in services
+            if all(service.labels.get(k) == v for k, v in labels.items())
+        ]
+        if output == "ndjson":
+            echo_ndjson(map(service_record, services))
+        elif output == "table":
+            rows.extend(map(service_record, services))
+        else:
+            click.echo(f"\nCloud Run services in {parent}:")
+            for service in services:
+                click.echo(
+                    f"- {service.name} ({service.uid})\n"
+                    f"  URL: {service.uri}\n"
+                    f"  Created: {service.create_time}\n"
+                    f"  Updated: {service.update_time}\n"
+                )
+    if output == "table":
+        echo_table(rows, ("name", "project", "region", "uri", "updated"))
+
+    problems = []
+    if unlisted:
+        problems.append(f"regions of {unlisted} of {len(projects)} projects")
+    if failed:
+        problems.append(f"services in {failed} of {len(parents)} locations")
+    if problems:
+        raise click.ClickException("Failed to list " + " and ".join(problems))
 
-    try:
-        if not force:
-            if not click.confirm(f"Are you sure you want to delete service '{name}'?"):
-                click.echo("Deletion cancelled.")
-                return
 
-        operation = client.delete_service(name=service_name)
-        operation.result()  # Wait for deletion to complete
+@services.command(name="delete")
+@click.option(
+    "--name",
+    "names",
+    multiple=True,
+    help="Name of the service to delete; repeatable",
+)
+@click.option(
+    "--label",
+    "labels",
+    multiple=True,
+    callback=parse_labels,
+    metavar="KEY=VALUE",
+    help="Delete every service in GCP_REGION with this label; repeatable",
+)
+@click.option(
+    "--from",
+    "from_file",
+    type=click.File("r"),
+    help="File with one service name per line; - reads stdin",
+)
+@click.option(
+    "--parallel",
+    type=click.IntRange(min=1),
+    default=10,
+    show_default=True,
+    help="Deletions in flight at once",
+)
+@click.option("--force", is_flag=True, help="Skip confirmation prompt")
+def delete_service(names, labels, from_file, parallel, force):
+    """Delete one or more Cloud Run services."""
+    from google.api_core import exceptions
+    from ..gcp import api_call, get_clients, list_services, run_operations
+
+    if not (names or labels or from_file):
+        raise click.UsageError("Give --name, --label or --from")
+    clients = get_clients()
+    region = clients.region
+    project_id = clients.project_id
+    client = clients.run()
+
+    # Format service names according to Cloud Run requirements
+    service_ids = [name.lower().replace(" ", "-") for name in names]
+    if from_file:
+        service_ids += [name.lower() for name in _read_names(from_file)]
+    if labels:
+        service_ids += [
+            service.name.rsplit("/", 1)[-1]
+            for service in list_services(clients, clients.parent())
+            if all(service.labels.get(k) == v for k, v in labels.items())
+        ]
+    service_ids = list(dict.fromkeys(service_ids))
+    if not service_ids:
+        click.echo("No services to delete.")
+        return
+
+    if not force:
+        listing = "\n".join(f"  {service_id}" for service_id in service_ids)
+        if not click.confirm(
+            f"Are you sure you want to delete these services in {region}?\n{listing}\n"
+        ):
+            click.echo("Deletion cancelled.")
+            return
+
+    def start(service_id):
+        with api_call("run.delete_service"):
+            return client.delete_service(
+                name=f"{clients.parent()}/services/{service_id}"
+            )
 
-        click.echo(f"\nService '{name}' deleted successfully.")
+    started = time.monotonic()
+    results = run_operations(start, service_ids, limit=parallel)
+    failed = 0
+    denied = False
+    for service_id in service_ids:
+        result = results[service_id]
+        error = result["error"]
+        if error is None:
+            click.echo(
+                f"Service '{service_id}' deleted successfully ({result['seconds']}s)."
+            )
+            continue
+        failed += 1
+        if isinstance(error, exceptions.NotFound):
+            error = f"not found in {region}"
+        elif isinstance(error, exceptions.PermissionDenied):
+            denied, error = True, "permission denied"
+        click.echo(f"Service '{service_id}' not deleted: {error}", err=True)
+    click.echo(
+        f"Deleted {len(service_ids) - failed} of {len(service_ids)} services "
+        f"in {time.monotonic() - started:.1f}s."
+    )
 
-    except exceptions.PermissionDenied:
+    if denied:
         raise click.ClickException(
             f"Permission denied. Please ensure you have 'run.services.delete' permission for project '{project_id}'\n"
             "You can grant this permission by running:\n"
             f"gcloud projects add-iam-policy-binding {project_id} "
             "--member=user:<your-email> --role=roles/run.developer"
         )
-    except exceptions.NotFound:
-        raise click.ClickException(f"Service '{name}' not found in {region}")
-    except Exception as e:
-        raise click.ClickException(f"Failed to delete service: {str(e)}")
+    if failed:
+        raise click.ClickException(f"Failed to delete {failed} services")
+
+
+def _read_names(file):
+    """Service names from a file with one per line; blank lines and # comments skipped."""
+    return [
+        line.strip()
+        for line in file
+        if line.strip() and not line.lstrip().startswith("#")
+    ]
 
 
 @services.command(name="update-policy")
 @click.option("--name", help="Name of the service", required=True)
 def update_policy(name):
     """Update the IAM policy for a Cloud Run service."""
-    credentials, default_project = default()
-    project_id = default_project
+    from google.api_core import exceptions
+    from ..gcp import IamPolicyManager, get_clients
 
-    client = run_v2.ServicesClient(credentials=credentials)
+    clients = get_clients()
+    project_id = clients.project_id
+    client = clients.run()
 
     try:
         # Set IAM policy using the new class
@@ -1,7 +1,26 @@
 import click
+import csv
 import json
+import os
+import sys
+import time
+from itertools import islice
+from ..engine import RequestEngine
+from ..filtering import select, server_params
+from ..mirror import Mirror
+from ..output import (
+    echo_list,
+    echo_ndjson,
+    echo_table,
+    iter_records,
+    output_format,
+)
+from ..pagination import RecordsPage, iter_pages, list_options
+from ..ratelimit import TokenBucket
 from ..utils import make_request
 
+VERSION_COLUMNS = ("id", "display_version", "status")
+
 
 @click.group()
 def versions():
@@ -13,8 +32,12 @@ def versions():
 @click.option("--app-id", required=True, help="ID of the app")
 @click.option("--version", required=True, help="Version to create")
 @click.option("--description", required=False, help="Description of the version")
+@click.option(
+    "--idempotency-key",
+    help="Key sent as Idempotency-Key so the request can be safely retried",
+)
 @click.pass_context
-def create(ctx, app_id, version, description):
+def create(ctx, app_id, version, description, idempotency_key):
     """Create a new version for an app."""
     url = f"{ctx.obj['BASE_URL']}/app-registry/api/apps/{app_id}/versions/"
     payload = {
@@ -23,33 +46,327 @@ def create(ctx, app_id, version, description):
             "description": description,
         }
     }
-    response = make_request("POST", url, json=payload)
+    response = make_request("POST", url, json=payload, idempotency_key=idempotency_key)
     click.echo(f"Version created successfully: {json.dumps(response.json(), indent=4)}")
 
 
 @versions.command(name="list")
-@click.option("--app-id", required=True, help="ID of the app")
+@click.option("--app-id", help="ID of the app")
+@click.option(
+    "--all-apps",
+    is_flag=True,
+    help="List the versions of every app, fetching them concurrently",
+)
+@click.option(
+    "--concurrency",
+    type=click.IntRange(min=1),
+    help="Maximum requests in flight with --all-apps (defaults to --pool-size)",
+)
+@list_options
 @click.pass_context
-def list_versions(ctx, app_id):
+def list_versions(
+    ctx,
+    app_id,
+    all_apps,
+    concurrency,
+    page_size,
+    limit,
+    prefetch,
+    fields,
+    where,
+    from_mirror,
+):
     """List all versions for an app."""
+    if all_apps:
+        list_all_versions(
+            ctx, concurrency, page_size, limit, fields, where, from_mirror
+        )
+        return
+    if not app_id:
+        raise click.MissingParameter(ctx=ctx, param=_param(ctx, "app_id"))
+
     url = f"{ctx.obj['BASE_URL']}/app-registry/api/apps/{app_id}/versions/"
-    response = make_request("GET", url)
-    click.echo(f"Versions: {json.dumps(response.json(), indent=4)}")
+    if from_mirror:
+        pages = [RecordsPage(Mirror(ctx.obj["ENV"], readonly=True).versions(app_id))]
+    else:
+        pages = iter_pages(
+            url,
+            page_size=page_size,
+            prefetch=prefetch,
+            params=server_params(fields, where),
+        )
+    echo_list(
+        "Versions",
+        pages,
+        columns=VERSION_COLUMNS,
+        limit=limit,
+        fields=fields,
+        where=where,
+    )
+
+
+def list_all_versions(
+    ctx, concurrency, page_size, limit, fields, where, from_mirror=False
+):
+    """List versions of every app, printing each app as soon as it arrives.
+
+    ``limit`` applies to each app's versions.
+    """
+    if from_mirror:
+        local = Mirror(ctx.obj["ENV"], readonly=True)
+        app_ids = [app["id"] for app in local.apps()]
+        results = (
+            (app_id, [RecordsPage(local.versions(str(app_id)))], None)
+            for app_id in app_ids
+        )
+    else:
+        url = f"{ctx.obj['BASE_URL']}/app-registry/api/apps/"
+        app_ids = [
+            app["id"] for app in iter_records(iter_pages(url, page_size=page_size))
+        ]
+
+        params = server_params(fields, where)
+
+        def fetch(app_id):
+            url = f"{ctx.obj['BASE_URL']}/app-registry/api/apps/{app_id}/versions/"
+            pages = iter_pages(url, page_size=page_size, prefetch=1, params=params)
+            return [page.load() for page in pages]
+
+        results = RequestEngine(concurrency).map(fetch, app_ids)
+
+    output = output_format()
+    table_rows = []
+    failed = []
+    for app_id, pages, error in results:
+        if error:
+            click.echo(f"Error listing versions for app {app_id}: {error}", err=True)
+            failed.append(app_id)
+        elif output in ("ndjson", "table"):
+            records = (
+                {"app_id": app_id, **record}
+                for record in islice(select(iter_records(pages), fields, where), limit)
+            )
+            if output == "ndjson":
+                echo_ndjson(records)
+            else:
+                table_rows.extend(records)
+        else:
+            echo_list(
+                f"Versions for app {app_id}",
+                pages,
+                VERSION_COLUMNS,
+                limit=limit,
+                fields=fields,
+                where=where,
+            )
+    if output == "table":
+        echo_table(table_rows, ("app_id",) + VERSION_COLUMNS)
+
+    if failed:
+        raise click.ClickException(
+            f"Failed to list versions for {len(failed)} of {len(app_ids)} apps"
+        )
+
+
+def _param(ctx, name):
+    return next(param for param in ctx.command.params if param.name == name)
 
 
 @versions.command(name="publish")
-@click.option("--app-id", required=True, help="ID of the app")
-@click.option("--version", required=True, help="Version to publish")
+@click.option("--app-id", help="ID of the app")
+@click.option("--version", help="Version to publish")
+@click.option(
+    "--idempotency-key",
+    help="Key sent as Idempotency-Key so the request can be safely retried",
+)
+@click.option(
+    "--from",
+    "from_file",
+    type=click.File("r"),
+    help="Publish every app_id,version pair in a CSV or NDJSON file",
+)
+@click.option(
+    "--concurrency",
+    type=click.IntRange(min=1),
+    default=4,
+    show_default=True,
+    help="Maximum publishes in flight with --from",
+)
+@click.option(
+    "--rate",
+    type=click.FloatRange(min=0, min_open=True),
+    help="Maximum publishes per second with --from",
+)
+@click.option(
+    "--report",
+    type=click.File("w"),
+    default="-",
+    help="Where to write one JSON result per item with --from (default: stdout)",
+)
+@click.option(
+    "--resume",
+    type=click.Path(dir_okay=False),
+    help="Checkpoint file of published items; items in it are skipped",
+)
 @click.pass_context
-def publish(ctx, app_id, version):
-    """Publish a version of an app."""
+def publish(
+    ctx,
+    app_id,
+    version,
+    idempotency_key,
+    from_file,
+    concurrency,
+    rate,
+    report,
+    resume,
+):
+    """Publish a version of an app, or many with --from."""
+    if from_file:
+        publish_many(
+            ctx, read_publish_items(from_file), concurrency, rate, report, resume
+        )
+        return
+    if not app_id:
+        raise click.MissingParameter(ctx=ctx, param=_param(ctx, "app_id"))
+    if not version:
+        raise click.MissingParameter(ctx=ctx, param=_param(ctx, "version"))
+
     url = f"{ctx.obj['BASE_URL']}/app-registry/api/apps/{app_id}/versions/{version}/publish"
-    response = make_request("POST", url)
+    response = make_request("POST", url, idempotency_key=idempotency_key)
     click.echo(
         f"Version published successfully: {json.dumps(response.json(), indent=4)}"
     )
 
 
+def read_publish_items(file):
+    """Read ``(app_id, version)`` pairs from a CSV or NDJSON file.
+
+    CSV files may start with an ``app_id,version`` header row.
+    """
+    lines = [
+        (number, line)
+        for number, line in enumerate(file.read().splitlines(), start=1)
+        if line.strip()
+    ]
+    if lines and lines[0][1].lstrip().startswith("{"):
+        items = []
+        for number, line in lines:
+            try:
+                row = json.loads(line)
+                items.append((str(row["app_id"]), str(row["version"])))
+            except (ValueError, TypeError, KeyError):
+                raise click.ClickException(
+                    f"Invalid line {number} in {file.name}: {line}"
+                )
+        return items
+
+    rows = [(number, next(csv.reader([line]))) for number, line in lines]
+    if rows and [cell.strip() for cell in rows[0][1][:2]] == ["app_id", "version"]:
+        rows = rows[1:]
+    items = []
+    for number, row in rows:
+        if len(row) < 2:
+            raise click.ClickException(
+                f"Invalid line {number} in {file.name}: {','.join(row)}"
+            )
+        items.append((row[0].strip(), row[1].strip()))
+    return items
+
+
+def publish_many(ctx, items, concurrency, rate, report, resume):
+    """Publish many versions with a worker pool, continuing past failures."""
+    done = set()
+    if resume and os.path.exists(resume):
+        with open(resume) as f:
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    done.add((row["app_id"], row["version"]))
+    checkpoint = open(resume, "a") if resume else None
+
+    pending = []
+    for app_id, version in items:
+        if (app_id, version) in done:
+            _write_result(report, app_id, version, "skipped")
+        else:
+            pending.append((app_id, version))
+
+    limiter = TokenBucket(rate) if rate else None
+
+    def publish_one(item):
+        app_id, version = item
+        if limiter:
+            limiter.acquire()
+        start = time.perf_counter()
+        url = f"{ctx.obj['BASE_URL']}/app-registry/api/apps/{app_id}/versions/{version}/publish"
+        make_request("POST", url)
+        return time.perf_counter() - start
+
+    progress = Progress(len(pending))
+    failed = 0
+    try:
+        engine = RequestEngine(concurrency)
+        for (app_id, version), duration, error in engine.map(publish_one, pending):
+            if error:
+                failed += 1
+                _write_result(report, app_id, version, "failed", error=str(error))
+            else:
+                _write_result(
+                    report,
+                    app_id,
+                    version,
+                    "published",
+                    duration_ms=round(duration * 1000),
+                )
+                if checkpoint:
+                    checkpoint.write(
+                        json.dumps({"app_id": app_id, "version": version}) + "\n"
+                    )
+                    checkpoint.flush()
+            progress.advance(failed)
+    finally:
+        progress.finish()
+        if checkpoint:
+            checkpoint.close()
+
+    if failed:
+        raise click.ClickException(
+            f"Failed to publish {failed} of {len(pending)} versions"
+        )
+
+
+def _write_result(report, app_id, version, status, **fields):
+    record = {"app_id": app_id, "version": version, "status": status, **fields}
+    report.write(json.dumps(record) + "\n")
+    report.flush()
+
+
+class Progress:
+    """A single self-updating progress line on stderr, shown only on a terminal."""
+
+    def __init__(self, total):
+        self.total = total
+        self.count = 0
+        self.started = time.monotonic()
+        self.enabled = sys.stderr.isatty()
+
+    def advance(self, failed):
+        self.count += 1
+        if not self.enabled:
+            return
+        elapsed = time.monotonic() - self.started
+        eta = elapsed / self.count * (self.total - self.count)
+        click.echo(
+            f"\r{self.count}/{self.total} done, {failed} failed, ETA {eta:.0f}s ",
+            err=True,
+            nl=False,
+        )
+
+    def finish(self):
+        if self.enabled and self.count:
+            click.echo(err=True)
+
+
 @versions.command(name="edit")
 @click.option("--app-id", required=True, help="ID of the app")
 @click.option("--version", required=True, help="Version to edit")
@@ -0,0 +1,80 @@
+from .mirror import record_hash
+
+# Fields that differ between environments for the same entity
+VOLATILE_FIELDS = ("id", "app_id", "inserted_at", "updated_at", "created_at")
+
+# Keys identifying the items of a list of objects, in order of preference
+ITEM_KEYS = ("slug", "name", "id")
+
+
+def canonical(record, ignore=VOLATILE_FIELDS):
+    """``record`` without its environment-specific fields, at any depth.
+
+    Nested objects, such as a version's extendables, carry their own ids and
+    timestamps, so those are dropped too.
+    """
+    if isinstance(record, dict):
+        return {
+            key: canonical(value, ignore)
+            for key, value in record.items()
+            if key not in ignore
+        }
+    if isinstance(record, list):
+        return [canonical(item, ignore) for item in record]
+    return record
+
+
+def structural_diff(left, right, path=""):
+    """``(path, left, right)`` for every leaf that differs between two values.
+
+    Objects are compared key by key and lists of objects by their ``slug``,
+    ``name`` or ``id``, so reordering alone is not a change. A value missing on
+    one side is reported as None there.
+    """
+    if isinstance(left, dict) and isinstance(right, dict):
+        changes = []
+        for key in sorted(set(left) | set(right), key=str):
+            changes += structural_diff(
+                left.get(key), right.get(key), f"{path}.{key}" if path else str(key)
+            )
+        return changes
+    if isinstance(left, list) and isinstance(right, list):
+        key = _item_key(left + right)
+        if key:
+            return structural_diff(
+                {item[key]: item for item in left},
+                {item[key]: item for item in right},
+                path,
+            )
+        if len(left) == len(right):
+            changes = []
+            for i, (a, b) in enumerate(zip(left, right)):
+                changes += structural_diff(a, b, f"{path}[{i}]")
+            return changes
+    return [] if left == right else [(path, left, right)]
+
+
+def _item_key(items):
+    if not items or not all(isinstance(item, dict) for item in items):
+        return None
+    for key in ITEM_KEYS:
+        values = [item.get(key) for item in items]
+        if all(isinstance(v, (str, int)) for v in values):
+            return key
+    return None
+
+
+def compare(left, right):
+    """Differences between two ``{key: record}`` maps.
+
+    Records are compared by the hash of their canonical JSON first, so only
+    changed ones are walked. Yields ``(key, change, changes)`` where change is
+    ``added`` (only on the right), ``removed`` or ``changed``.
+    """
+    for key in sorted(set(left) | set(right), key=str):
+        if key not in left:
+            yield key, "added", []
+        elif key not in right:
+            yield key, "removed", []
+        elif record_hash(left[key]) != record_hash(right[key]):
+            yield key, "changed", structural_diff(left[key], right[key])
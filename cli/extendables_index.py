@@ -0,0 +1,100 @@
+import json
+import os
+import time
+from itertools import chain
+import click
+from .cache import cache_dir
+from .output import iter_records
+from .pagination import iter_pages
+
+# Seconds an index is trusted before it is revalidated against the registry
+DEFAULT_MAX_AGE = 300
+
+
+class ExtendablesIndex:
+    """Local slug -> extendable map of one environment's catalogue.
+
+    The index is stored as JSON next to the response cache together with the
+    catalogue's ``ETag``/``Last-Modified``, so refreshing an unchanged catalogue
+    costs a single 304 and lookups work offline.
+    """
+
+    def __init__(self, env, directory=None):
+        self.path = os.path.join(directory or cache_dir(), f"extendables-{env}.json")
+        self.data = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"refreshed_at": 0, "validators": {}, "extendables": {}}
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.data, f)
+        os.replace(tmp_path, self.path)
+
+    @property
+    def age(self):
+        return time.time() - self.data["refreshed_at"]
+
+    def get(self, slug):
+        return self.data["extendables"].get(slug)
+
+    def slugs(self):
+        return sorted(self.data["extendables"])
+
+    def refresh(self, base_url, max_age=DEFAULT_MAX_AGE):
+        """Bring the index up to date if it is older than ``max_age`` seconds.
+
+        Every page of the catalogue is read; the validators of the first page
+        decide whether it changed. A stale index is still used when the registry cannot be reached.
+        """
+        if self.data["extendables"] and self.age < max_age:
+            return
+
+        headers = {}
+        validators = self.data["validators"]
+        if self.data["extendables"]:
+            if "ETag" in validators:
+                headers["If-None-Match"] = validators["ETag"]
+            if "Last-Modified" in validators:
+                headers["If-Modified-Since"] = validators["Last-Modified"]
+
+        pages = iter_pages(f"{base_url}/app-registry/api/extendables", headers=headers)
+        try:
+            first = next(pages)
+            if first.response.status_code == 304:
+                pages.close()
+            else:
+                records = list(iter_records(chain([first], pages)))
+        except click.ClickException as e:
+            if not self.data["extendables"]:
+                raise
+            click.echo(f"Warning: using cached extendables index ({e})", err=True)
+            return
+
+        if first.response.status_code != 304:
+            if not all(isinstance(item, dict) and "slug" in item for item in records):
+                raise click.ClickException(
+                    "Unexpected response listing extendables: no data array"
+                )
+            self.data["extendables"] = {item["slug"]: item for item in records}
+            self.data["validators"] = {
+                name: first.response.headers[name]
+                for name in ("ETag", "Last-Modified")
+                if name in first.response.headers
+            }
+        self.data["refreshed_at"] = time.time()
+        self._save()
+
+
+def complete_slugs(ctx, param, incomplete):
+    """Shell completion of extendable slugs from the local index (no network)."""
+    env = ctx.find_root().params.get("env") or "local"
+    return [
+        slug for slug in ExtendablesIndex(env).slugs() if slug.startswith(incomplete)
+    ]
@@ -0,0 +1,108 @@
+import click
+
+
+def parse_fields(ctx, param, value):
+    """Click callback turning ``id,name`` into ``("id", "name")``."""
+    if not value:
+        return None
+    fields = tuple(field.strip() for field in value.split(",") if field.strip())
+    if not fields:
+        raise click.BadParameter("expected a comma separated list of fields")
+    return fields
+
+
+def parse_where(ctx, param, values):
+    """Click callback turning ``key=value`` / ``key!=value`` into predicates."""
+    predicates = []
+    for value in values:
+        op = "!=" if "!=" in value else "="
+        path, sep, expected = value.partition(op)
+        if not sep or not path.strip():
+            raise click.BadParameter(f"expected KEY=VALUE or KEY!=VALUE, got {value!r}")
+        predicates.append((path.strip(), op, expected))
+    return predicates
+
+
+def parse_labels(ctx, param, values):
+    """Click callback turning repeated ``key=value`` into a label dict."""
+    labels = {}
+    for value in values:
+        key, sep, expected = value.partition("=")
+        if not sep or not key.strip():
+            raise click.BadParameter(f"expected KEY=VALUE, got {value!r}")
+        labels[key.strip()] = expected
+    return labels
+
+
+def lookup(record, path):
+    """Values found at a dotted path; lists along the way are searched item by item."""
+    values = [record]
+    for key in path.split("."):
+        found = []
+        for value in values:
+            items = value if isinstance(value, list) else [value]
+            found.extend(
+                item[key] for item in items if isinstance(item, dict) and key in item
+            )
+        values = found
+    return values
+
+
+def _text(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if value is None:
+        return "null"
+    return str(value)
+
+
+def matches(record, predicates):
+    for path, op, expected in predicates:
+        found = any(
+            _text(item) == expected
+            for value in lookup(record, path)
+            for item in (value if isinstance(value, list) else [value])
+        )
+        if found != (op == "="):
+            return False
+    return True
+
+
+def project(record, fields):
+    """Keep only ``fields``; a nested path becomes a key holding a list of values."""
+    projected = {}
+    for field in fields:
+        values = lookup(record, field)
+        if values:
+            projected[field] = values if "." in field else values[0]
+    return projected
+
+
+def select(records, fields=None, where=None):
+    """Filter and project records lazily, as they stream in."""
+    for record in records:
+        if not isinstance(record, dict):
+            yield record
+            continue
+        if where and not matches(record, where):
+            continue
+        yield project(record, fields) if fields else record
+
+
+def server_params(fields=None, where=None):
+    """Query parameters asking the registry to filter and project for us.
+
+    Registries that ignore them return full records, which ``select`` still
+    filters and projects client-side, so output is the same either way. Only
+    equality on top-level keys is forwarded, and fields used by ``where`` are
+    requested so the client-side check can still run.
+    """
+    params = {}
+    if fields:
+        roots = [field.split(".")[0] for field in fields]
+        roots += [path.split(".")[0] for path, _, _ in where or []]
+        params["fields"] = ",".join(dict.fromkeys(roots))
+    for path, op, expected in where or []:
+        if op == "=" and "." not in path:
+            params[f"filter[{path}]"] = expected
+    return params
@@ -0,0 +1,794 @@
+"""Google Cloud managers used by the ``services`` commands.
+
+This module imports the Cloud Run / Cloud Build SDKs and grpc, so it must only
+be imported from inside command callbacks, never at CLI import time.
+"""
+
+import click
+import datetime
+from contextlib import contextmanager
+import os
+import re
+import requests
+import threading
+import time
+from google.cloud import run_v2
+from google.cloud.devtools import cloudbuild_v1
+from google.cloud.devtools.cloudbuild_v1.types import (
+    GitHubEventsConfig,
+    PushFilter,
+    BuildTrigger,
+    BuildStep,
+)
+from google.cloud.run_v2.types import Container
+from google.auth import default
+from google.auth.transport.requests import Request
+import google.api_core.exceptions
+import google.auth.exceptions
+from .build_options import DEFAULT_BUILD_CACHE, DEFAULT_CACHE_TTL_HOURS
+from .engine import RequestEngine
+from .ratelimit import RATE_LIMIT_TARGETS, report_throttled, throttle
+from .trace import trace_span
+from .utils import get_session
+
+# Seconds between polls of long-running operations
+POLL_INTERVAL = 2.0
+
+
+@contextmanager
+def api_call(name, **fields):
+    """Trace a Google API call and hold it to the ``--rate-limit`` of its API.
+
+    ``name`` starts with the API (``run``, ``build``...); a ``ResourceExhausted``
+    error lowers that API's rate.
+    """
+    target = name.split(".")[0]
+    limiter = throttle(target) if target in RATE_LIMIT_TARGETS else None
+    try:
+        with trace_span("gcp", name, **fields):
+            yield
+    except google.api_core.exceptions.ResourceExhausted:
+        if limiter:
+            report_throttled(limiter, target)
+        raise
+    else:
+        if limiter:
+            limiter.succeeded()
+
+
+class GcpClients:
+    """Credentials, project, region and API clients shared by the whole process.
+
+    Off GCP, ``google.auth.default()`` may probe the metadata server, so it is
+    resolved once and every manager and command reuses the same credentials
+    and gRPC channels (in batch mode and the agent, across commands too).
+    Credentials refresh their access token when it expires.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._credentials = None
+        self._project_id = None
+        self._clients = {}
+
+    def _resolve(self):
+        with self._lock:
+            if self._credentials is None:
+                with api_call("auth.default"):
+                    self._credentials, self._project_id = default()
+        return self._credentials, self._project_id
+
+    @property
+    def credentials(self):
+        return self._resolve()[0]
+
+    @property
+    def project_id(self):
+        project_id = self._resolve()[1]
+        if not project_id:
+            raise click.ClickException(
+                "No project specified. Please set the GOOGLE_CLOUD_PROJECT environment variable"
+            )
+        return project_id
+
+    @property
+    def region(self):
+        region = os.getenv("GCP_REGION")
+        if not region:
+            raise click.ClickException("GCP_REGION is not set")
+        return region
+
+    def parent(self, project_id=None, region=None):
+        return f"projects/{project_id or self.project_id}/locations/{region or self.region}"
+
+    def token(self):
+        """A valid access token for REST calls, refreshed only when expired."""
+        credentials = self.credentials
+        with self._lock:
+            if not credentials.valid:
+                with api_call("auth.refresh"):
+                    credentials.refresh(Request())
+            return credentials.token
+
+    def _client(self, key, factory):
+        credentials = self.credentials
+        with self._lock:
+            if key not in self._clients:
+                self._clients[key] = factory(credentials=credentials)
+            return self._clients[key]
+
+    def run(self):
+        return self._client("run", run_v2.ServicesClient)
+
+    def build(self):
+        return self._client("build", cloudbuild_v1.CloudBuildClient)
+
+
+_clients = None
+_clients_lock = threading.Lock()
+
+
+def get_clients():
+    """The process-wide ``GcpClients``."""
+    global _clients
+    with _clients_lock:
+        if _clients is None:
+            _clients = GcpClients()
+        return _clients
+
+
+class IamPolicyManager:
+    """IAM policy manager enables unauthenticated access to Cloud Run services."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def set_invoker_policy(self, resource_name):
+        policy_request = {
+            "resource": resource_name,
+            "policy": {
+                "bindings": [
+                    {
+                        "role": "roles/run.invoker",
+                        "members": ["allUsers"],
+                    }
+                ],
+                "version": 3,
+            },
+        }
+        with api_call("run.set_iam_policy"):
+            return self.client.set_iam_policy(request=policy_request)
+
+    def has_invoker_policy(self, resource_name):
+        """Whether ``allUsers`` may already invoke the service."""
+        try:
+            with api_call("run.get_iam_policy"):
+                policy = self.client.get_iam_policy(request={"resource": resource_name})
+        except google.api_core.exceptions.NotFound:
+            return False
+        return any(
+            binding.role == "roles/run.invoker" and "allUsers" in binding.members
+            for binding in policy.bindings
+        )
+
+
+class CloudBuildTriggerManager:
+    """Manages the creation of Cloud Build triggers."""
+
+    def __init__(self, clients, owner, repo, service_account):
+        self.client = clients.build()
+        self.project_id = clients.project_id
+        self.region = clients.region
+        self.owner = owner
+        self.repo = repo
+        self.service_account = service_account
+
+    @property
+    def image(self):
+        """Artifact Registry image the trigger builds, without a tag."""
+        return f"{self.region}-docker.pkg.dev/{self.project_id}/cloud-run-source-deploy/{self.owner}/{self.repo}"
+
+    def build_steps(self, name, build_cache=DEFAULT_BUILD_CACHE, cache_ttl=None):
+        """Steps that build, push and deploy ``main``.
+
+        ``none`` rebuilds every layer (reproducible), ``registry`` reuses the
+        layers of the previous ``:latest`` image with ``--cache-from``, and
+        ``kaniko`` builds and pushes with kaniko's layer cache in
+        ``<image>/cache``, expiring after ``cache_ttl`` hours.
+        """
+        image = f"{self.image}:$COMMIT_SHA"
+        if build_cache == "kaniko":
+            steps = [
+                BuildStep(
+                    id="Build",
+                    name="gcr.io/kaniko-project/executor:latest",
+                    args=[
+                        f"--destination={image}",
+                        f"--destination={self.image}:latest",
+                        "--dockerfile=Dockerfile",
+                        "--cache=true",
+                        f"--cache-repo={self.image}/cache",
+                        f"--cache-ttl={cache_ttl or DEFAULT_CACHE_TTL_HOURS}h",
+                    ],
+                ),
+            ]
+        elif build_cache == "registry":
+            steps = [
+                BuildStep(
+                    id="Pull",
+                    name="gcr.io/cloud-builders/docker",
+                    entrypoint="bash",
+                    # The first build has no previous image to reuse
+                    args=["-c", f"docker pull {self.image}:latest || exit 0"],
+                ),
+                BuildStep(
+                    id="Build",
+                    name="gcr.io/cloud-builders/docker",
+                    args=[
+                        "build",
+                        "--cache-from",
+                        f"{self.image}:latest",
+                        "-t",
+                        image,
+                        "-t",
+                        f"{self.image}:latest",
+                        ".",
+                        "-f",
+                        "Dockerfile",
+                    ],
+                ),
+                BuildStep(
+                    id="Push",
+                    name="gcr.io/cloud-builders/docker",
+                    args=["push", "--all-tags", self.image],
+                ),
+            ]
+        else:
+            steps = [
+                BuildStep(
+                    id="Build",
+                    name="gcr.io/cloud-builders/docker",
+                    args=[
+                        "build",
+                        "--no-cache",
+                        "-t",
+                        image,
+                        ".",
+                        "-f",
+                        "Dockerfile",
+                    ],
+                ),
+                BuildStep(
+                    id="Push",
+                    name="gcr.io/cloud-builders/docker",
+                    args=[
+                        "push",
+                        image,
+                    ],
+                ),
+            ]
+        steps.append(
+            BuildStep(
+                id="Deploy",
+                name="gcr.io/google.com/cloudsdktool/cloud-sdk:slim",
+                args=[
+                    "gcloud",
+                    "run",
+                    "deploy",
+                    name,
+                    f"--image={image}",
+                    f"--labels=managed-by=gcp-cloud-build-deploy-cloud-run,commit-sha=$COMMIT_SHA,gcb-build-id=$BUILD_ID,peek-app-id={name}",
+                    f"--region={self.region}",
+                ],
+            )
+        )
+        return steps
+
+    def build_trigger(
+        self,
+        name,
+        build_cache=DEFAULT_BUILD_CACHE,
+        cache_ttl=None,
+        machine_type=None,
+    ):
+        """The trigger that builds and deploys every push to ``main``."""
+        steps = self.build_steps(name, build_cache, cache_ttl)
+
+        trigger = BuildTrigger(
+            name=name,
+            github=GitHubEventsConfig(
+                owner=self.owner,
+                name=self.repo,
+                push=PushFilter(branch="main"),
+            ),
+            # Gotta have this or API call will fail with invalid argument
+            service_account=self.service_account,
+            substitutions={
+                "_SERVICE_NAME": name,
+                "_DEPLOY_REGION": self.region,
+                "_AR_HOSTNAME": f"{self.region}-docker.pkg.dev",
+                "_PLATFORM": "managed",
+            },
+        )
+        trigger.autodetect = True
+        trigger.build = cloudbuild_v1.Build(
+            steps=steps,
+            # Need this or API call will fail
+            options=cloudbuild_v1.BuildOptions(
+                logging="CLOUD_LOGGING_ONLY",
+                machine_type=machine_type or "UNSPECIFIED",
+            ),
+        )
+        return trigger
+
+    def create_build_trigger(self, name, **options):
+        """Create the trigger; ``options`` are those of ``build_trigger``."""
+        request = cloudbuild_v1.CreateBuildTriggerRequest(
+            project_id=self.project_id,
+            trigger=self.build_trigger(name, **options),
+        )
+
+        try:
+            with api_call("build.create_build_trigger"):
+                return self.client.create_build_trigger(request=request)
+        except google.api_core.exceptions.AlreadyExists:
+            raise click.ClickException(f"Build trigger '{name}' already exists")
+        except google.api_core.exceptions.GoogleAPICallError as e:
+            raise click.ClickException(f"Failed to create build trigger: {str(e)}")
+
+    def get_build_trigger(self, name):
+        """The existing trigger called ``name``, or None."""
+        try:
+            with api_call("build.get_build_trigger"):
+                return self.client.get_build_trigger(
+                    project_id=self.project_id, trigger_id=name
+                )
+        except google.api_core.exceptions.NotFound:
+            return None
+
+    def update_build_trigger(self, current, desired):
+        """Replace ``current``'s configuration with ``desired``."""
+        desired.id = current.id
+        try:
+            with api_call("build.update_build_trigger"):
+                return self.client.update_build_trigger(
+                    project_id=self.project_id, trigger_id=current.id, trigger=desired
+                )
+        except google.api_core.exceptions.GoogleAPICallError as e:
+            raise click.ClickException(f"Failed to update build trigger: {str(e)}")
+
+    @staticmethod
+    def drifted(current, desired):
+        """Whether an existing trigger differs from the one we would create."""
+
+        def shape(trigger):
+            return (
+                trigger.github.owner,
+                trigger.github.name,
+                trigger.github.push.branch,
+                trigger.service_account,
+                trigger.build.options.machine_type,
+                [
+                    (step.id, step.name, step.entrypoint, list(step.args))
+                    for step in trigger.build.steps
+                ],
+            )
+
+        return shape(current) != shape(desired)
+
+    def run_build_trigger(self, trigger_id):
+        """Start a build of ``main``; returns the build's long-running operation."""
+        request = cloudbuild_v1.RunBuildTriggerRequest(
+            project_id=self.project_id,
+            trigger_id=trigger_id,
+            source=cloudbuild_v1.RepoSource(
+                branch_name="main",
+            ),
+        )
+        try:
+            with api_call("build.run_build_trigger"):
+                return self.client.run_build_trigger(request=request)
+        except google.api_core.exceptions.GoogleAPICallError as e:
+            raise click.ClickException(f"Failed to run build trigger: {str(e)}")
+
+
+class CloudRunServiceManager:
+    """Manages the creation of Cloud Run services."""
+
+    def __init__(self, clients=None):
+        clients = clients or get_clients()
+        self.client = clients.run()
+        self.parent = clients.parent()
+
+    def service_name(self, name):
+        return f"{self.parent}/services/{name}"
+
+    def get_service(self, name):
+        """The existing service called ``name``, or None."""
+        try:
+            with api_call("run.get_service"):
+                return self.client.get_service(name=self.service_name(name))
+        except google.api_core.exceptions.NotFound:
+            return None
+
+    def create_service(self, name, image=None, app_id=None):
+        operation = self.start_create_service(name, image=image, app_id=app_id)
+        try:
+            with api_call("run.wait_create_service"):
+                return operation.result()
+        except google.api_core.exceptions.GoogleAPICallError as e:
+            raise click.ClickException(f"Failed to create service: {str(e)}")
+
+    def start_create_service(self, name, image=None, app_id=None):
+        """Ask Cloud Run to create the service; returns its long-running operation."""
+        containers = []
+        if image:
+            container = Container(image=image)
+            if name:
+                container.env = [
+                    run_v2.types.EnvVar(name="PEEK_APP_ID", value=app_id or name)
+                ]
+            containers.append(container)
+        else:
+            # uses a place holder image since you can't create a service without an image
+            # and we don't have an image yet because we haven't created and run the build trigger
+            # smells like a bug, but it works for now.
+            # we might revisit this and first create a build so that we have an image, then create a service, then create the build trigger
+            container = Container(
+                image="us-docker.pkg.dev/cloudrun/container/hello",
+            )
+            containers.append(container)
+
+        template = run_v2.RevisionTemplate(
+            containers=containers,
+        )
+
+        service = run_v2.Service(
+            template=template,
+            labels={"peek-app-id": app_id or name},
+        )
+
+        try:
+            with api_call("run.create_service"):
+                return self.client.create_service(
+                    parent=self.parent,
+                    service=service,
+                    service_id=name,
+                )
+        except google.api_core.exceptions.AlreadyExists:
+            raise click.ClickException(f"Service '{name}' already exists")
+        except google.api_core.exceptions.GoogleAPICallError as e:
+            raise click.ClickException(f"Failed to create service: {str(e)}")
+
+    def start_update_image(self, name, image):
+        """Point the service's first container at ``image``; returns the operation.
+
+        The rest of the revision template is kept. The service's ``etag`` from
+        the read is sent back, so a concurrent change makes the update fail
+        instead of being overwritten.
+        """
+        service_name = name if name.startswith("projects/") else self.service_name(name)
+        with api_call("run.get_service"):
+            service = self.client.get_service(name=service_name)
+        if service.template.containers:
+            service.template.containers[0].image = image
+        else:
+            service.template.containers.append(Container(image=image))
+        # A fixed revision name would clash with the revision being created
+        service.template.revision = ""
+        with api_call("run.update_service"):
+            return self.client.update_service(service=service)
+
+
+def service_record(service):
+    """Plain dict of the fields ``services list`` shows."""
+    _, project_id, _, region, _, name = service.name.split("/")
+    return {
+        "name": name,
+        "project": project_id,
+        "region": region,
+        "uri": service.uri,
+        "uid": service.uid,
+        "created": str(service.create_time),
+        "updated": str(service.update_time),
+        "labels": dict(service.labels),
+    }
+
+
+RUN_LOCATIONS_URL = "https://run.googleapis.com/v1/projects/{project_id}/locations"
+
+
+def list_locations(clients, project_id):
+    """Regions where Cloud Run is available to ``project_id``.
+
+    The v2 list APIs don't accept the ``-`` location wildcard and the SDK has no
+    locations client, so this uses the Cloud Run admin REST API.
+    """
+    url = RUN_LOCATIONS_URL.format(project_id=project_id)
+    params = {}
+    locations = []
+    while True:
+        with api_call("run.list_locations", project=project_id):
+            response = get_session(url).get(
+                url,
+                params=params,
+                headers={"Authorization": f"Bearer {clients.token()}"},
+                timeout=30,
+            )
+        response.raise_for_status()
+        page = response.json()
+        locations += [location["locationId"] for location in page.get("locations", [])]
+        if not page.get("nextPageToken"):
+            return locations
+        params["pageToken"] = page["nextPageToken"]
+
+
+def list_services(clients, parent, page_size=None):
+    """All services under ``parent`` (one project and region)."""
+    request = run_v2.ListServicesRequest(parent=parent, page_size=page_size or 0)
+    with api_call("run.list_services", parent=parent):
+        return list(clients.run().list_services(request=request))
+
+
+class OperationRef:
+    """A long-running operation known only by name, e.g. printed by --no-wait.
+
+    Offers the ``done``/``result`` subset of ``google.api_core`` operations
+    that ``wait_operations`` needs.
+    """
+
+    def __init__(self, clients, name):
+        self.api = "build" if name.startswith("operations/build/") else "run"
+        client = clients.build() if self.api == "build" else clients.run()
+        self.operations_client = client.transport.operations_client
+        self.name = name
+        self._operation = None
+
+    def done(self):
+        with api_call(f"{self.api}.get_operation"):
+            self._operation = self.operations_client.get_operation(self.name)
+        return self._operation.done
+
+    def result(self):
+        if self._operation.error.code:
+            raise click.ClickException(self._operation.error.message)
+        return self.name
+
+
+def operation_name(operation):
+    return getattr(operation, "name", None) or operation.operation.name
+
+
+def poll(operation):
+    """``operation.done()``, a GetOperation call held to its API's rate limit."""
+    if isinstance(operation, OperationRef):
+        return operation.done()  # already an api_call
+    name = operation_name(operation)
+    api = "build" if name.startswith("operations/build/") else "run"
+    with api_call(f"{api}.get_operation"):
+        return operation.done()
+
+
+def wait_operations(
+    operations, poll_interval=POLL_INTERVAL, concurrency=None, on_poll=None
+):
+    """Poll several long-running operations together until all finish.
+
+    ``operations`` maps a label to an operation. Pending operations are polled
+    concurrently (``done()`` is one API call each) and a combined progress line
+    is written to stderr. Returns ``{label: {"result", "error", "seconds"}}``;
+    one failed operation does not stop the others from being awaited.
+    ``on_poll()`` is called after every round, e.g. to tail build logs.
+    """
+    return run_operations(
+        operations.__getitem__,
+        list(operations),
+        limit=len(operations),
+        poll_interval=poll_interval,
+        concurrency=concurrency,
+        on_poll=on_poll,
+    )
+
+
+def run_operations(
+    start, labels, limit, poll_interval=POLL_INTERVAL, concurrency=None, on_poll=None
+):
+    """Start ``start(label)`` operations with at most ``limit`` in flight.
+
+    Operations are started as earlier ones finish, and those in flight are
+    polled together as in ``wait_operations``, which has the same return value.
+    ``seconds`` counts from each operation's own start. A label whose
+    ``start`` raises is recorded as failed without stopping the others.
+    """
+    engine = RequestEngine(concurrency or min(limit, len(labels)) or 1)
+    progress = _Progress(labels)
+    began = time.monotonic()
+    queued = list(labels)
+    running = {}
+    results = {}
+
+    def finish(label, started, result=None, error=None):
+        seconds = round(time.monotonic() - started, 1)
+        results[label] = {"result": result, "error": error, "seconds": seconds}
+
+    while queued or running:
+        batch, queued = queued[: limit - len(running)], queued[limit - len(running) :]
+        starting = {label: time.monotonic() for label in batch}
+        for label, operation, error in engine.map(start, batch):
+            if error:
+                finish(label, starting[label], error=error)
+            else:
+                running[label] = (operation, starting[label])
+
+        polled = engine.map(lambda label: poll(running[label][0]), list(running))
+        for label, done, error in polled:
+            if not (done or error):
+                continue
+            operation, started = running.pop(label)
+            result = None
+            if error is None:
+                try:
+                    result = operation.result()
+                except Exception as e:
+                    error = e
+            finish(label, started, result, error)
+        if on_poll:
+            on_poll()
+        progress.update(results, time.monotonic() - began)
+        if running:
+            time.sleep(poll_interval)
+    progress.close()
+    return results
+
+
+class _Progress:
+    """One status line for a set of operations on stderr.
+
+    On a terminal the line is redrawn in place; otherwise it is printed only
+    when it changes, so CI logs don't get a line per poll.
+    """
+
+    def __init__(self, operations):
+        self.labels = list(operations)
+        self.tty = click.get_text_stream("stderr").isatty()
+        self.last = None
+
+    def update(self, results, elapsed):
+        """Redraw the status line after ``on_poll`` output."""
+        if len(self.labels) <= 3:
+            line = " | ".join(
+                f"{label}: {self._state(results.get(label))}" for label in self.labels
+            )
+        else:
+            failed = sum(1 for result in results.values() if result["error"])
+            line = f"{len(results)}/{len(self.labels)} done, {failed} failed"
+        if self.tty:
+            click.echo(f"\r{line} ({elapsed:.0f}s)", nl=False, err=True)
+        elif line != self.last:
+            click.echo(f"{line} ({elapsed:.0f}s)", err=True)
+        self.last = line
+
+    def close(self):
+        if self.tty:
+            click.echo(err=True)
+
+    @staticmethod
+    def _state(result):
+        if result is None:
+            return "running"
+        return "failed" if result["error"] else f"done in {result['seconds']}s"
+
+
+def echo_status(line):
+    """Print a line to stderr, clearing a progress line being redrawn there."""
+    if click.get_text_stream("stderr").isatty():
+        line = f"\r\x1b[K{line}"
+    click.echo(line, err=True)
+
+
+class BuildTail:
+    """Follows one Cloud Build build: step status changes and new log lines.
+
+    The build is configured with ``CLOUD_LOGGING_ONLY``, so its log is read
+    from the Cloud Logging ``entries:list`` REST API with the shared access
+    token; if that fails, step status is still followed. If the build itself
+    can't be read, following stops with a warning and the caller keeps
+    waiting on its operations.
+    """
+
+    ENTRIES_URL = "https://logging.googleapis.com/v2/entries:list"
+
+    def __init__(self, clients, build_id, logs=True):
+        self.clients = clients
+        self.build_id = build_id
+        self.logs = logs
+        self.build = None
+        self.statuses = {}
+        self.since = None
+        self.seen = set()
+        self.stopped = False
+
+    def poll(self):
+        if self.stopped:
+            return
+        try:
+            with api_call("build.get_build"):
+                self.build = self.clients.build().get_build(
+                    project_id=self.clients.project_id, id=self.build_id
+                )
+        except (
+            google.api_core.exceptions.GoogleAPICallError,
+            google.auth.exceptions.GoogleAuthError,
+        ) as e:
+            echo_status(f"Warning: not following the build ({e})")
+            self.stopped = True
+            return
+        if self.logs:
+            self._tail_logs()
+        for step in self.build.steps:
+            status = step.status.name
+            if self.statuses.get(step.id) != status:
+                self.statuses[step.id] = status
+                took = self._seconds(step)
+                suffix = f" in {took:.1f}s" if took and status != "WORKING" else ""
+                echo_status(f"[{step.id}] {status}{suffix}")
+
+    def _tail_logs(self):
+        query = f'resource.type="build" AND resource.labels.build_id="{self.build_id}"'
+        if self.since:
+            query += f' AND timestamp>="{self.since}"'
+        body = {
+            "resourceNames": [f"projects/{self.clients.project_id}"],
+            "filter": query,
+            "orderBy": "timestamp asc",
+            "pageSize": 1000,
+        }
+        try:
+            while True:
+                with api_call("logging.list_entries"):
+                    response = get_session(self.ENTRIES_URL).post(
+                        self.ENTRIES_URL,
+                        json=body,
+                        headers={"Authorization": f"Bearer {self.clients.token()}"},
+                        timeout=30,
+                    )
+                response.raise_for_status()
+                page = response.json()
+                for entry in page.get("entries", []):
+                    self._echo_entry(entry)
+                if not page.get("nextPageToken"):
+                    break
+                body["pageToken"] = page["nextPageToken"]
+        except (requests.RequestException, google.auth.exceptions.GoogleAuthError) as e:
+            echo_status(f"Warning: not tailing build logs ({e})")
+            self.logs = False
+
+    def _echo_entry(self, entry):
+        if entry.get("insertId") in self.seen:
+            return
+        self.seen.add(entry.get("insertId"))
+        self.since = entry.get("timestamp") or self.since
+        text = entry.get("textPayload", "").rstrip()
+        match = re.search(r"Step #(\d+)", entry.get("labels", {}).get("build_step", ""))
+        step = "build"
+        if match and self.build and int(match.group(1)) < len(self.build.steps):
+            step = self.build.steps[int(match.group(1))].id
+        for line in text.splitlines():
+            echo_status(f"[{step}] {line}")
+
+    @staticmethod
+    def _seconds(step):
+        start, end = step.timing.start_time, step.timing.end_time
+        if start is None:
+            return None
+        end = end or datetime.datetime.now(datetime.timezone.utc)
+        return (end - start).total_seconds()
+
+    def summary(self):
+        """``(step, status, seconds)`` for every step of the last polled build."""
+        if self.build is None:
+            return []
+        return [
+            (step.id, step.status.name, self._seconds(step))
+            for step in self.build.steps
+        ]
@@ -0,0 +1,40 @@
+import importlib
+import click
+
+
+class LazyGroup(click.Group):
+    """A click group whose subcommands are imported only when dispatched.
+
+    ``lazy_subcommands`` maps a command name to an import path of the form
+    ``"package.module:attribute"``. Help output still lists every command.
+    """
+
+    def __init__(self, *args, lazy_subcommands=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_subcommands = lazy_subcommands or {}
+
+    def parse_args(self, ctx, args):
+        given = list(args)  # the parser consumes ``args``
+        rest = super().parse_args(ctx, args)
+        if ctx.parent is None:
+            # The root's own options, so batch can repeat them for every line
+            unparsed = len(ctx.protected_args) + len(ctx.args)
+            ctx.meta["global_args"] = given[: len(given) - unparsed]
+        return rest
+
+    def list_commands(self, ctx):
+        return sorted(set(super().list_commands(ctx)) | set(self.lazy_subcommands))
+
+    def get_command(self, ctx, cmd_name):
+        if cmd_name in self.lazy_subcommands:
+            return self._load(cmd_name)
+        return super().get_command(ctx, cmd_name)
+
+    def _load(self, cmd_name):
+        module_name, attr = self.lazy_subcommands[cmd_name].split(":")
+        command = getattr(importlib.import_module(module_name), attr)
+        if not isinstance(command, click.Command):
+            raise ValueError(
+                f"Lazy loading of {self.lazy_subcommands[cmd_name]} did not return a click command"
+            )
+        return command
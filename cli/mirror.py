@@ -0,0 +1,370 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from itertools import chain
+import click
+from .cache import cache_dir
+from .engine import RequestEngine
+from .output import iter_records
+from .pagination import iter_pages
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS apps (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    updated_at TEXT,
+    hash TEXT NOT NULL,
+    record TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS versions (
+    app_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    display_version TEXT,
+    status TEXT,
+    updated_at TEXT,
+    hash TEXT NOT NULL,
+    record TEXT NOT NULL,
+    PRIMARY KEY (app_id, id)
+);
+CREATE INDEX IF NOT EXISTS versions_status ON versions (status);
+CREATE TABLE IF NOT EXISTS extendables (
+    slug TEXT PRIMARY KEY,
+    name TEXT,
+    hash TEXT NOT NULL,
+    record TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS version_extendables (
+    app_id TEXT NOT NULL,
+    version_id TEXT NOT NULL,
+    slug TEXT NOT NULL,
+    PRIMARY KEY (app_id, version_id, slug)
+);
+CREATE INDEX IF NOT EXISTS version_extendables_slug ON version_extendables (slug);
+CREATE TABLE IF NOT EXISTS sync_state (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    app_updated_at TEXT,
+    run_id INTEGER
+);
+CREATE TABLE IF NOT EXISTS sync_runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at REAL NOT NULL,
+    finished_at REAL
+);
+"""
+
+# Read-only queries offered by ``peek mirror query``
+USES_EXTENDABLE_SQL = """
+SELECT DISTINCT v.app_id, a.name AS app_name, v.id AS version_id,
+       v.display_version, v.status
+FROM version_extendables ve
+JOIN versions v ON v.app_id = ve.app_id AND v.id = ve.version_id
+LEFT JOIN apps a ON a.id = v.app_id
+WHERE ve.slug = ?
+ORDER BY v.app_id, v.id
+"""
+UNPUBLISHED_SQL = """
+SELECT v.app_id, a.name AS app_name, v.id AS version_id, v.display_version, v.status
+FROM versions v
+LEFT JOIN apps a ON a.id = v.app_id
+WHERE v.status IS NULL OR v.status != 'published'
+ORDER BY v.app_id, v.id
+"""
+
+
+def mirror_path(env):
+    return os.path.join(cache_dir(), f"mirror-{env}.sqlite3")
+
+
+def versions_url(api, app):
+    return f"{api}/apps/{app['id']}/versions/"
+
+
+def record_hash(record):
+    """Hash of a record's canonical JSON, used to detect changed rows."""
+    canonical = json.dumps(record, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class SyncCounts:
+    """Per-table counts of inserted, updated and deleted rows."""
+
+    def __init__(self):
+        self.counts = {}
+
+    def add(self, table, change, n=1):
+        table_counts = self.counts.setdefault(
+            table, {"inserted": 0, "updated": 0, "deleted": 0}
+        )
+        table_counts[change] += n
+
+    @property
+    def changed(self):
+        return sum(sum(c.values()) for c in self.counts.values())
+
+
+class Mirror:
+    """Local SQLite copy of one environment's apps, versions and extendables."""
+
+    def __init__(self, env, path=None, readonly=False):
+        self.path = path or mirror_path(env)
+        if readonly:
+            if not os.path.exists(self.path):
+                raise click.ClickException(
+                    f"No mirror for '{env}' yet. Run 'peek --env {env} mirror sync' first."
+                )
+            self.db = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        else:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.db = sqlite3.connect(self.path)
+            self.db.executescript(SCHEMA)
+        self.db.row_factory = sqlite3.Row
+
+    def close(self):
+        self.db.close()
+
+    # Reading
+
+    def query(self, sql, params=()):
+        return [dict(row) for row in self.db.execute(sql, params)]
+
+    def _records(self, sql, params=()):
+        return [json.loads(row["record"]) for row in self.db.execute(sql, params)]
+
+    def apps(self):
+        return self._records("SELECT record FROM apps ORDER BY id")
+
+    def versions(self, app_id):
+        return self._records(
+            "SELECT record FROM versions WHERE app_id = ? ORDER BY id", (app_id,)
+        )
+
+    def extendables(self):
+        return self._records("SELECT record FROM extendables ORDER BY slug")
+
+    # Syncing
+
+    def sync(self, base_url, concurrency=None, full=False):
+        """Pull the registry into the mirror and return the row changes.
+
+        Collections, and every app's versions, are fetched with
+        ``If-None-Match``/``If-Modified-Since`` and skipped when unchanged, so
+        an unchanged app costs one 304; versions of different apps are
+        revalidated concurrently. An interrupted sync is resumed by the next
+        one, skipping apps it already finished.
+        """
+        counts = SyncCounts()
+        run_id = self._start_run()
+        api = f"{base_url}/app-registry/api"
+
+        apps = self._sync_collection(
+            f"{api}/apps/", "apps", counts, full, self._upsert_app
+        )
+        self._sync_collection(
+            f"{api}/extendables/", "extendables", counts, full, self._upsert_extendable
+        )
+        self.db.commit()
+
+        if apps is None:
+            apps = self.apps()
+        pending = [
+            app
+            for app in apps
+            if self._versions_need_sync(versions_url(api, app), run_id)
+        ]
+
+        # Validators are read here: the connection belongs to this thread
+        requests = [
+            (app, {} if full else self._validators(versions_url(api, app)))
+            for app in pending
+        ]
+
+        def fetch(request):
+            app, headers = request
+            pages = iter_pages(versions_url(api, app), prefetch=1, headers=headers)
+            first = next(pages)
+            if first.response.status_code == 304:
+                pages.close()
+                return first.response, None
+            return first.response, list(iter_records(chain([first], pages)))
+
+        failed = 0
+        for (app, _), result, error in RequestEngine(concurrency).map(fetch, requests):
+            if error:
+                click.echo(
+                    f"Error syncing versions of app {app['id']}: {error}", err=True
+                )
+                failed += 1
+                continue
+            response, records = result
+            if records is not None:
+                self._replace_versions(str(app["id"]), records, counts)
+            self._save_state(
+                versions_url(api, app),
+                response,
+                run_id,
+                app_updated_at=app.get("updated_at"),
+            )
+            self.db.commit()
+
+        if failed:
+            # The run stays open so the next sync resumes where this one stopped
+            raise click.ClickException(
+                f"Failed to sync versions of {failed} of {len(pending)} apps"
+            )
+        self.db.execute(
+            "UPDATE sync_runs SET finished_at = ? WHERE id = ?", (time.time(), run_id)
+        )
+        self.db.commit()
+        return counts
+
+    def _start_run(self):
+        row = self.db.execute(
+            "SELECT id FROM sync_runs WHERE finished_at IS NULL ORDER BY id DESC LIMIT 1"
+        ).fetchone()
+        if row:
+            return row["id"]
+        cursor = self.db.execute(
+            "INSERT INTO sync_runs (started_at) VALUES (?)", (time.time(),)
+        )
+        self.db.commit()
+        return cursor.lastrowid
+
+    def _state(self, url):
+        return self.db.execute(
+            "SELECT * FROM sync_state WHERE url = ?", (url,)
+        ).fetchone()
+
+    def _validators(self, url):
+        state = self._state(url)
+        headers = {}
+        if state and state["etag"]:
+            headers["If-None-Match"] = state["etag"]
+        if state and state["last_modified"]:
+            headers["If-Modified-Since"] = state["last_modified"]
+        return headers
+
+    def _save_state(self, url, response, run_id, app_updated_at=None):
+        previous = self._state(url)
+        if response.status_code == 304 and previous:
+            etag, last_modified = previous["etag"], previous["last_modified"]
+        else:
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+        self.db.execute(
+            "INSERT OR REPLACE INTO sync_state "
+            "(url, etag, last_modified, app_updated_at, run_id) VALUES (?, ?, ?, ?, ?)",
+            (url, etag, last_modified, app_updated_at, run_id),
+        )
+
+    def _versions_need_sync(self, url, run_id):
+        # Versions change without touching their app, so they are always
+        # revalidated, except those already done by the run being resumed
+        state = self._state(url)
+        return state is None or state["run_id"] != run_id
+
+    def _sync_collection(self, url, table, counts, full, upsert):
+        """Sync one top-level collection; returns its records, or None if unchanged."""
+        headers = {} if full else self._validators(url)
+        pages = iter_pages(url, headers=headers)
+        first = next(pages)
+        if first.response.status_code == 304:
+            pages.close()
+            return None
+
+        records = []
+        seen = set()
+        for record in iter_records(chain([first], pages)):
+            seen.add(upsert(record, counts))
+            records.append(record)
+        key = "slug" if table == "extendables" else "id"
+        for row in self.db.execute(f"SELECT {key} FROM {table}").fetchall():
+            if row[key] not in seen:
+                self.db.execute(f"DELETE FROM {table} WHERE {key} = ?", (row[key],))
+                if table == "apps":
+                    self._delete_versions(row[key])
+                counts.add(table, "deleted")
+        self._save_state(url, first.response, run_id=None)
+        return records
+
+    def _upsert(self, table, key, values, record, counts):
+        digest = record_hash(record)
+        key_column = next(iter(key))
+        row = self.db.execute(
+            f"SELECT hash FROM {table} WHERE {key_column} = ?", (key[key_column],)
+        ).fetchone()
+        if row and row["hash"] == digest:
+            return
+        columns = {**key, **values, "hash": digest, "record": json.dumps(record)}
+        self.db.execute(
+            f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' * len(columns))})",
+            list(columns.values()),
+        )
+        counts.add(table, "updated" if row else "inserted")
+
+    def _upsert_app(self, record, counts):
+        app_id = str(record["id"])
+        values = {"name": record.get("name"), "updated_at": record.get("updated_at")}
+        self._upsert("apps", {"id": app_id}, values, record, counts)
+        return app_id
+
+    def _upsert_extendable(self, record, counts):
+        values = {"name": record.get("name")}
+        self._upsert("extendables", {"slug": record["slug"]}, values, record, counts)
+        return record["slug"]
+
+    def _replace_versions(self, app_id, records, counts):
+        existing = {
+            row["id"]: row["hash"]
+            for row in self.db.execute(
+                "SELECT id, hash FROM versions WHERE app_id = ?", (app_id,)
+            )
+        }
+        seen = set()
+        for record in records:
+            version_id = str(record.get("id") or record.get("display_version"))
+            seen.add(version_id)
+            digest = record_hash(record)
+            if existing.get(version_id) == digest:
+                continue
+            self.db.execute(
+                "INSERT OR REPLACE INTO versions (app_id, id, display_version, status, "
+                "updated_at, hash, record) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    app_id,
+                    version_id,
+                    record.get("display_version"),
+                    record.get("status"),
+                    record.get("updated_at"),
+                    digest,
+                    json.dumps(record),
+                ),
+            )
+            self.db.execute(
+                "DELETE FROM version_extendables WHERE app_id = ? AND version_id = ?",
+                (app_id, version_id),
+            )
+            for extendable in record.get("extendables") or []:
+                slug = extendable.get("slug") or extendable.get("extendable_slug")
+                if slug:
+                    self.db.execute(
+                        "INSERT OR IGNORE INTO version_extendables VALUES (?, ?, ?)",
+                        (app_id, version_id, slug),
+                    )
+            counts.add("versions", "updated" if version_id in existing else "inserted")
+        for version_id in set(existing) - seen:
+            self._delete_versions(app_id, version_id)
+            counts.add("versions", "deleted")
+
+    def _delete_versions(self, app_id, version_id=None):
+        where = "app_id = ?" + (" AND id = ?" if version_id else "")
+        params = (app_id, version_id) if version_id else (app_id,)
+        self.db.execute(f"DELETE FROM versions WHERE {where}", params)
+        self.db.execute(
+            f"DELETE FROM version_extendables WHERE {where.replace('id =', 'version_id =')}",
+            params,
+        )
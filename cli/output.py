@@ -0,0 +1,211 @@
+import json
+import re
+from itertools import islice
+import click
+from .filtering import select
+
+OUTPUT_FORMATS = ["json", "ndjson", "table", "raw"]
+
+CHUNK_SIZE = 64 * 1024
+
+# Characters that change the parser state outside and inside strings
+_STRUCTURAL = re.compile(r'["{}\[\],:]')
+_STRING_END = re.compile(r'["\\]')
+_NON_SPACE = re.compile(r"\S")
+
+
+class DataArrayParser:
+    """Incrementally extracts the records of a document's top-level ``data`` array.
+
+    Text is fed in chunks as it arrives; every complete array element is decoded
+    and returned straight away, and text already consumed is dropped, so memory
+    stays proportional to the largest single record. Documents without a
+    top-level ``data`` array are returned whole by ``close``. After ``close``,
+    ``envelope`` holds the rest of the document (e.g. pagination ``meta``).
+    """
+
+    def __init__(self):
+        self.buf = ""
+        self.pos = 0
+        self.depth = 0
+        self.in_string = False
+        self.string_start = None
+        self.last_key = None
+        self.pending_key = None
+        self.element_start = None
+        self.prefix = None
+        self.suffix_start = None
+        self.envelope = None
+        self.mode = "seek"  # seek -> array -> done
+
+    def feed(self, text):
+        self.buf += text
+        records = []
+        while self.mode != "done":
+            if self.in_string:
+                match = _STRING_END.search(self.buf, self.pos)
+                if match is None:
+                    self.pos = len(self.buf)
+                    break
+                if match.group() == "\\":
+                    if match.end() >= len(self.buf):
+                        self.pos = match.start()
+                        break
+                    self.pos = match.end() + 1
+                    continue
+                self.in_string = False
+                self.pos = match.end()
+                if self.depth == 1 and self.mode == "seek":
+                    self.pending_key = self.buf[self.string_start + 1 : match.start()]
+                continue
+
+            match = _STRUCTURAL.search(self.buf, self.pos)
+            if match is None:
+                self.pos = len(self.buf)
+                break
+            char = match.group()
+            self.pos = match.end()
+
+            if char == '"':
+                self.in_string = True
+                self.string_start = match.start()
+            elif char == ":":
+                self.last_key, self.pending_key = self.pending_key, None
+            elif char in "{[":
+                self.depth += 1
+                if (
+                    char == "["
+                    and self.depth == 2
+                    and self.mode == "seek"
+                    and self.last_key == "data"
+                ):
+                    self.mode = "array"
+                    self.prefix = self.buf[: match.start()]
+                    self.element_start = self.pos
+            elif char in "}]":
+                self.depth -= 1
+                if self.mode == "array" and self.depth == 1:
+                    records.extend(self._take_element(match.start()))
+                    self.suffix_start = self.pos
+                    self.mode = "done"
+            elif char == "," and self.mode == "array" and self.depth == 2:
+                records.extend(self._take_element(match.start()))
+                self.element_start = self.pos
+            if char in ",{}" and self.depth <= 1:
+                self.last_key = None
+        self._trim()
+        return records
+
+    def _take_element(self, end):
+        text = self.buf[self.element_start : end].strip()
+        return [json.loads(text)] if text else []
+
+    def _trim(self):
+        # Outside the data array the whole document may be needed by close()
+        if self.mode == "array":
+            drop = self.element_start
+            self.buf = self.buf[drop:]
+            self.pos -= drop
+            self.element_start = 0
+            if self.in_string:
+                self.string_start -= drop
+
+    def close(self):
+        """Return the whole document if no ``data`` array was found."""
+        if self.mode == "array":
+            raise ValueError("Response ended inside the data array")
+        if self.mode == "done":
+            rest = self.buf[self.suffix_start :]
+            self.envelope = json.loads(self.prefix + "[]" + rest)
+            return []
+        if not _NON_SPACE.search(self.buf):
+            self.envelope = {}
+            return []
+        document = json.loads(self.buf)
+        self.envelope = document if isinstance(document, dict) else {}
+        return [document]
+
+
+def output_format():
+    return click.get_current_context().obj.get("OUTPUT") or "json"
+
+
+def echo_list(label, pages, columns, limit=None, fields=None, where=None):
+    """Print the pages of a list endpoint in the format chosen with ``--output``.
+
+    ``json`` keeps the historical ``Label: {...}`` pretty-printed output (pages
+    are merged into one ``data`` array), ``ndjson`` prints one record per line
+    as they are parsed, ``raw`` copies each page's bytes through untouched and
+    ``table`` shows ``columns`` (or ``fields``). Records are filtered with
+    ``where``, projected to ``fields`` and capped at ``limit`` as they stream.
+    """
+    output = output_format()
+    selecting = fields or where
+    if output == "raw":
+        if selecting:
+            raise click.UsageError(
+                "--fields and --where cannot be used with raw output"
+            )
+        stdout = click.get_binary_stream("stdout")
+        for page in pages:
+            for chunk in page.chunks():
+                stdout.write(chunk)
+            stdout.flush()
+        return
+
+    if output in ("ndjson", "table"):
+        records = islice(select(iter_records(pages), fields, where), limit)
+        if output == "ndjson":
+            echo_ndjson(records)
+        else:
+            echo_table(records, fields or columns)
+        return
+
+    documents = []
+    data = []
+    for page in pages:
+        documents.append(page.document())
+        data.extend(select(_data(documents[-1]), fields, where))
+        if limit and len(data) >= limit:
+            break
+    if len(documents) == 1 and not (limit or selecting):
+        document = documents[0]
+    else:
+        document = {"data": data[:limit]}
+    click.echo(f"{label}: {json.dumps(document, indent=4)}")
+
+
+def iter_records(pages):
+    for page in pages:
+        yield from page.records()
+
+
+def _data(document):
+    data = document.get("data") if isinstance(document, dict) else None
+    return data if isinstance(data, list) else []
+
+
+def echo_ndjson(records):
+    for record in records:
+        click.echo(json.dumps(record, separators=(",", ":")))
+
+
+def echo_table(records, columns):
+    """Print the given columns of every record as an aligned text table."""
+    rows = [[_cell(record, column) for column in columns] for record in records]
+    widths = [
+        max([len(column)] + [len(row[i]) for row in rows])
+        for i, column in enumerate(columns)
+    ]
+    click.echo("  ".join(c.upper().ljust(w) for c, w in zip(columns, widths)).rstrip())
+    for row in rows:
+        click.echo("  ".join(v.ljust(w) for v, w in zip(row, widths)).rstrip())
+
+
+def _cell(record, column):
+    value = record.get(column, "") if isinstance(record, dict) else ""
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, separators=(",", ":"))
+    return str(value)
@@ -0,0 +1,197 @@
+import codecs
+import json
+import click
+from .engine import RequestEngine
+from .filtering import parse_fields, parse_where
+from .output import CHUNK_SIZE, DataArrayParser
+from .trace import trace_body_read
+from .utils import make_request
+
+# Pages fetched ahead of the one being printed
+DEFAULT_PREFETCH = 4
+
+
+class Page:
+    """One page of a list endpoint, read as bytes, records or a whole document.
+
+    The first page is streamed; ``envelope`` (the document without its ``data``
+    array) becomes available once the page has been read.
+    """
+
+    def __init__(self, response):
+        self.response = response
+        self.envelope = None
+        self._document = None
+
+    def load(self):
+        """Read and decode the whole page now (used for prefetched pages)."""
+        self.document()
+        return self
+
+    def document(self):
+        if self._document is None:
+            self._document = self.response.json()
+            trace_body_read(self.response, len(self.response.content))
+            is_dict = isinstance(self._document, dict)
+            self.envelope = self._document if is_dict else {}
+        return self._document
+
+    def records(self):
+        if self._document is not None:
+            data = self.envelope.get("data")
+            yield from data if isinstance(data, list) else [self._document]
+            return
+        parser = DataArrayParser()
+        decoder = codecs.getincrementaldecoder(self.response.encoding or "utf-8")()
+        size = 0
+        for chunk in self.response.iter_content(CHUNK_SIZE):
+            size += len(chunk)
+            yield from parser.feed(decoder.decode(chunk))
+        trace_body_read(self.response, size)
+        yield from parser.feed(decoder.decode(b"", final=True))
+        yield from parser.close()
+        self.envelope = parser.envelope
+
+    def chunks(self):
+        if self._document is not None:
+            yield self.response.content
+            return
+        parser = DataArrayParser()
+        decoder = codecs.getincrementaldecoder(self.response.encoding or "utf-8")()
+        size = 0
+        for chunk in self.response.iter_content(CHUNK_SIZE):
+            size += len(chunk)
+            parser.feed(decoder.decode(chunk))
+            yield chunk
+        trace_body_read(self.response, size)
+        parser.feed(decoder.decode(b"", final=True))
+        parser.close()
+        self.envelope = parser.envelope
+
+    def finish(self):
+        """Read whatever the consumer left unread so ``envelope`` is known."""
+        if self.envelope is None:
+            for _ in self.records():
+                pass
+
+
+class RecordsPage:
+    """A page built from records already at hand (e.g. from the local mirror)."""
+
+    def __init__(self, records):
+        self.envelope = {"data": records}
+
+    def document(self):
+        return self.envelope
+
+    def records(self):
+        return iter(self.envelope["data"])
+
+    def chunks(self):
+        yield json.dumps(self.envelope).encode()
+
+
+def iter_pages(
+    url, page_size=None, prefetch=DEFAULT_PREFETCH, params=None, headers=None
+):
+    """Yield every page of a list endpoint, following its pagination metadata.
+
+    Page-numbered responses (``meta.total_pages``) have up to ``prefetch`` later
+    pages fetched concurrently while earlier ones are consumed. Cursor responses
+    (``meta.after``/``meta.next_cursor`` or ``links.next``) name the next page,
+    so only one page can be fetched ahead. Unpaginated endpoints yield one page.
+    ``params`` are sent with every page request, ``headers`` (e.g. conditional
+    request validators) only with the first.
+    """
+    params = dict(params or {})
+    if page_size:
+        params["page_size"] = page_size
+    first = Page(
+        make_request(
+            "GET",
+            url,
+            params=params or None,
+            headers=headers,
+            cache=True,
+            stream=True,
+        )
+    )
+    yield first
+    first.finish()
+
+    meta = first.envelope.get("meta") or {}
+    if meta.get("total_pages"):
+        current = meta.get("page_number") or meta.get("page") or 1
+        yield from RequestEngine(prefetch).prefetch(
+            lambda number: _load_page(url, {**params, "page": number}),
+            range(current + 1, meta["total_pages"] + 1),
+        )
+        return
+
+    following = {"request": _next_request(url, params, first.envelope)}
+
+    def next_requests():
+        while following["request"]:
+            request, following["request"] = following["request"], None
+            yield request
+
+    def load(request):
+        page = _load_page(*request)
+        following["request"] = _next_request(url, params, page.envelope)
+        return page
+
+    yield from RequestEngine(1).prefetch(load, next_requests())
+
+
+def _load_page(url, params):
+    return Page(make_request("GET", url, params=params or None, cache=True)).load()
+
+
+def _next_request(url, params, envelope):
+    """The ``(url, params)`` of the page after a cursor-paginated page, if any."""
+    links = envelope.get("links") or {}
+    if isinstance(links, dict) and links.get("next"):
+        return links["next"], None
+    meta = envelope.get("meta") or {}
+    cursor = meta.get("after") or meta.get("next_cursor")
+    if cursor:
+        return url, {**params, "after": cursor}
+    return None
+
+
+def list_options(f):
+    """Pagination and record selection options shared by the list commands."""
+    f = click.option(
+        "--from-mirror",
+        is_flag=True,
+        help="Read from the local mirror (see 'peek mirror sync') instead of the API",
+    )(f)
+    f = click.option(
+        "--where",
+        multiple=True,
+        callback=parse_where,
+        metavar="KEY=VALUE",
+        help="Only show records where KEY (a dotted path such as "
+        "extendables.slug) equals VALUE; KEY!=VALUE excludes. Repeatable",
+    )(f)
+    f = click.option(
+        "--fields",
+        callback=parse_fields,
+        help="Comma separated fields to keep in each record (dotted paths allowed)",
+    )(f)
+    f = click.option(
+        "--prefetch",
+        type=click.IntRange(min=1),
+        default=DEFAULT_PREFETCH,
+        show_default=True,
+        help="Pages fetched concurrently ahead of the one being printed",
+    )(f)
+    f = click.option(
+        "--limit", type=click.IntRange(min=1), help="Stop after this many records"
+    )(f)
+    f = click.option(
+        "--page-size",
+        type=click.IntRange(min=1),
+        help="Records to request per page",
+    )(f)
+    return f
@@ -0,0 +1,140 @@
+import threading
+import time
+import click
+
+
+class TokenBucket:
+    """Thread-safe token bucket allowing ``rate`` acquisitions per second.
+
+    ``burst`` tokens may be taken back to back before callers start waiting.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take a token, sleeping until one is available. Returns the wait."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.burst, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+# Targets whose request rate can be limited with --rate-limit TARGET=RATE
+RATE_LIMIT_TARGETS = ["registry", "run", "build"]
+
+
+class AdaptiveTokenBucket(TokenBucket):
+    """Token bucket that slows down when the server says it is overloaded.
+
+    ``throttled()`` (a 429 or ``ResourceExhausted``) halves the rate, down to a
+    tenth of the configured one; every later success adds back a twentieth of
+    the configured rate until it is reached again.
+    """
+
+    def __init__(self, rate):
+        super().__init__(rate, burst=max(1, int(rate)))
+        self.max_rate = rate
+        self.waits = 0
+        self.waited = 0.0
+
+    def acquire(self):
+        wait = super().acquire()
+        if wait:
+            with self._lock:
+                self.waits += 1
+                self.waited += wait
+        return wait
+
+    def throttled(self):
+        with self._lock:
+            self.rate = max(self.max_rate / 10, self.rate / 2)
+            return self.rate
+
+    def succeeded(self):
+        with self._lock:
+            if self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(key, rate):
+    """The process-wide limiter for ``key`` (e.g. ``registry:stage``), or None.
+
+    Every thread and, in batch mode or the agent, every command shares it, so
+    the rate holds however many requests run at once.
+    """
+    if not rate:
+        return None
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None or limiter.max_rate != rate:
+            limiter = _limiters[key] = AdaptiveTokenBucket(rate)
+        return limiter
+
+
+def parse_rate_limits(ctx, param, values):
+    """Click callback turning ``TARGET=RATE`` values into ``{target: rate}``.
+
+    Each value may hold several comma-separated pairs; click already splits
+    ``PEEK_RATE_LIMITS`` on whitespace.
+    """
+    values = [part for value in values or () for part in value.split(",") if part]
+    limits = {}
+    for value in values:
+        target, _, rate = value.partition("=")
+        if target not in RATE_LIMIT_TARGETS:
+            raise click.BadParameter(
+                f"unknown target {target!r}, expected one of "
+                + ", ".join(RATE_LIMIT_TARGETS)
+            )
+        try:
+            limits[target] = float(rate)
+        except ValueError:
+            raise click.BadParameter(f"expected TARGET=RATE, got {value!r}")
+        if limits[target] <= 0:
+            raise click.BadParameter(f"rate must be positive, got {value!r}")
+    return limits
+
+
+def throttle(target, key=None):
+    """Wait for a token of ``target``'s limiter; returns the limiter, or None.
+
+    The rate comes from ``--rate-limit``; with ``--verbose`` waits are reported.
+    """
+    ctx = click.get_current_context(silent=True)
+    obj = (ctx.obj if ctx else None) or {}
+    limiter = get_limiter(key or target, (obj.get("RATE_LIMITS") or {}).get(target))
+    if limiter is None:
+        return None
+    wait = limiter.acquire()
+    if wait and obj.get("VERBOSE"):
+        click.echo(
+            f"Throttled {key or target} for {wait:.2f}s "
+            f"(rate {limiter.rate:.2f}/s, {limiter.waits} waits, "
+            f"{limiter.waited:.2f}s total)",
+            err=True,
+        )
+    return limiter
+
+
+def report_throttled(limiter, key):
+    """Lower ``limiter``'s rate after the server pushed back, saying so if verbose."""
+    rate = limiter.throttled()
+    ctx = click.get_current_context(silent=True)
+    if ctx and ctx.obj and ctx.obj.get("VERBOSE"):
+        click.echo(f"Rate limited by {key}; lowering rate to {rate:.2f}/s", err=True)
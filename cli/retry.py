@@ -0,0 +1,65 @@
+import random
+import time
+from email.utils import parsedate_to_datetime
+
+DEFAULT_MAX_RETRIES = 2
+DEFAULT_BASE_DELAY = 0.5
+DEFAULT_MAX_DELAY = 10.0
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Methods that are safe to send twice. Anything else (POST) is only retried
+# when the caller supplied an Idempotency-Key header.
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter for transient request failures."""
+
+    def __init__(
+        self,
+        max_retries=DEFAULT_MAX_RETRIES,
+        base_delay=DEFAULT_BASE_DELAY,
+        max_delay=DEFAULT_MAX_DELAY,
+    ):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    @property
+    def max_attempts(self):
+        return self.max_retries + 1
+
+    def can_retry(self, method, headers):
+        """Whether a request may be sent again without side effects."""
+        return method.upper() in IDEMPOTENT_METHODS or "Idempotency-Key" in (
+            headers or {}
+        )
+
+    def delay(self, attempt, response=None):
+        """Seconds to wait before the attempt following ``attempt`` (1-based).
+
+        A ``Retry-After`` header on a 429 or 503 response takes precedence over
+        the jittered backoff; both are capped at ``max_delay``.
+        """
+        if response is not None and response.status_code in (429, 503):
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                return min(self.max_delay, retry_after)
+        return random.uniform(
+            0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        )
+
+
+def parse_retry_after(value):
+    """Parse a Retry-After header given in seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,206 @@
+import json
+import re
+import threading
+import time
+from contextlib import contextmanager
+import click
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# Path segments following these collection names are identifiers and are
+# replaced with placeholders so traces group by endpoint, not by record.
+URL_PLACEHOLDERS = {"apps": "{app_id}", "versions": "{version}"}
+
+_local = threading.local()
+
+
+def url_template(url):
+    """Reduce a registry URL to its path with identifiers replaced."""
+    path = re.sub(r"^[a-z]+://[^/]+", "", url).split("?")[0]
+    segments = path.split("/")
+    for i in range(1, len(segments)):
+        placeholder = URL_PLACEHOLDERS.get(segments[i - 1])
+        if placeholder and segments[i]:
+            segments[i] = placeholder
+    return "/".join(segments)
+
+
+class _TimedConnectionMixin:
+    """Accumulates the time spent establishing connections on this thread."""
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _local.connect_time = getattr(_local, "connect_time", 0.0) + (
+                time.perf_counter() - start
+            )
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose connections report TCP/TLS connect time."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": TimedHTTPConnectionPool,
+            "https": TimedHTTPSConnectionPool,
+        }
+
+
+def reset_connect_time():
+    _local.connect_time = 0.0
+
+
+def connect_time():
+    """Seconds spent connecting on this thread since the last reset."""
+    return getattr(_local, "connect_time", 0.0)
+
+
+class Tracer:
+    """Writes timing events as JSON lines and a summary when the command ends."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.command = None
+        self.started = time.perf_counter()
+        self.totals = {}
+        self.unread = {}
+        self._lock = threading.Lock()
+
+    def record(self, event):
+        if self.command is None:
+            # The innermost context at the first event names the leaf command.
+            ctx = click.get_current_context(silent=True)
+            if ctx is not None:
+                self.command = " ".join(ctx.command_path.split()[1:])
+        line = json.dumps(event, default=str)
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+    def record_http(self, method, url, status, duration, **fields):
+        self._add("http", duration)
+        self.record(
+            {
+                "type": "http",
+                "method": method,
+                "url": url_template(url),
+                "status": status,
+                "total_ms": _ms(duration),
+                **fields,
+            }
+        )
+
+    def defer_http(self, response, method, url, start, **fields):
+        """Hold a streamed response's event until ``body_read`` is called.
+
+        Its ``total_ms`` then covers the body download and ``bytes_in`` is the
+        size of the body as read.
+        """
+        with self._lock:
+            self.unread[response] = (method, url, start, time.perf_counter(), fields)
+
+    def body_read(self, response, bytes_in=None):
+        with self._lock:
+            pending = self.unread.pop(response, None)
+        if pending is None:
+            return
+        method, url, start, _, fields = pending
+        if bytes_in is not None:
+            fields["bytes_in"] = bytes_in
+        duration = time.perf_counter() - start
+        self.record_http(method, url, response.status_code, duration, **fields)
+
+    def _flush_unread(self):
+        # Bodies never read (e.g. after --limit) count up to their headers
+        with self._lock:
+            unread, self.unread = self.unread, {}
+        for response, (method, url, start, headers_at, fields) in unread.items():
+            if "Content-Length" in response.headers:
+                fields["bytes_in"] = int(response.headers["Content-Length"])
+            fields["body"] = "unread"
+            self.record_http(
+                method, url, response.status_code, headers_at - start, **fields
+            )
+
+    def record_span(self, kind, name, duration, **fields):
+        self._add(kind, duration)
+        self.record({"type": kind, "name": name, "total_ms": _ms(duration), **fields})
+
+    def _add(self, kind, duration):
+        with self._lock:
+            calls, total = self.totals.get(kind, (0, 0.0))
+            self.totals[kind] = (calls + 1, total + duration)
+
+    def close(self):
+        """Write the per-command summary line and close the trace file."""
+        self._flush_unread()
+        total = time.perf_counter() - self.started
+        summary = {"type": "summary", "command": self.command, "total_ms": _ms(total)}
+        remote = 0.0
+        for kind, (calls, duration) in sorted(self.totals.items()):
+            summary[f"{kind}_calls"] = calls
+            summary[f"{kind}_ms"] = _ms(duration)
+            remote += duration
+        # Concurrent calls can overlap, so local time is a lower bound.
+        summary["local_ms"] = _ms(max(0.0, total - remote))
+        self.record(summary)
+        self.stream.close()
+
+
+def get_tracer():
+    """The tracer of the running command, if ``--trace`` was given."""
+    ctx = click.get_current_context(silent=True)
+    if ctx is None or not ctx.obj:
+        return None
+    return ctx.obj.get("TRACER")
+
+
+def trace_body_read(response, bytes_in=None):
+    """Record a streamed response's trace event now that its body was read."""
+    tracer = get_tracer()
+    if tracer is not None:
+        tracer.body_read(response, bytes_in)
+
+
+@contextmanager
+def trace_span(kind, name, **fields):
+    """Time a block (e.g. a GCP API call) and record it in the trace."""
+    tracer = get_tracer()
+    if tracer is None:
+        yield
+        return
+    start = time.perf_counter()
+    error = None
+    try:
+        yield
+    except Exception as e:
+        error = type(e).__name__
+        raise
+    finally:
+        if error:
+            fields["error"] = error
+        tracer.record_span(kind, name, time.perf_counter() - start, **fields)
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2)
@@ -1,11 +1,83 @@
 import click
 import requests
 import os
+import threading
+import time
+from functools import partial
+from urllib.parse import urlsplit
+from .cache import cached_response
+from .ratelimit import report_throttled, throttle
+from .retry import RETRYABLE_STATUS_CODES, RetryPolicy
+from .trace import (
+    TimedHTTPAdapter,
+    connect_time,
+    get_tracer,
+    reset_connect_time,
+    trace_body_read,
+)
 
+DEFAULT_POOL_SIZE = 10
 
-def make_request(method, url, **kwargs):
-    """Make an authenticated request."""
-    kwargs.setdefault("headers", {})["Content-Type"] = "application/json"
+_session_lock = threading.Lock()
+
+
+def get_session(url):
+    """Get the shared keep-alive session for the host of the given URL.
+
+    Sessions live in ``ctx.obj["SESSIONS"]`` keyed by scheme and host, so every
+    request a command makes to the same environment reuses pooled connections.
+    """
+    obj = click.get_current_context().obj
+    sessions = obj.setdefault("SESSIONS", {})
+    parts = urlsplit(url)
+    origin = f"{parts.scheme}://{parts.netloc}"
+
+    with _session_lock:
+        session = sessions.get(origin)
+        if session is None:
+            pool_size = obj.get("POOL_SIZE") or DEFAULT_POOL_SIZE
+            adapter = TimedHTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            sessions[origin] = session
+    return session
+
+
+def close_sessions(sessions):
+    """Close every session in the given registry and empty it."""
+    with _session_lock:
+        for session in sessions.values():
+            session.close()
+        sessions.clear()
+
+
+def register_sessions(ctx):
+    """Give the root context a session registry it closes on exit.
+
+    A registry already present in ``ctx.obj`` belongs to the caller (e.g. a
+    process running several commands) and is left open.
+    """
+    if "SESSIONS" not in ctx.obj:
+        ctx.obj["SESSIONS"] = {}
+        ctx.call_on_close(partial(close_sessions, ctx.obj["SESSIONS"]))
+
+
+def make_request(method, url, cache=False, idempotency_key=None, **kwargs):
+    """Make an authenticated request.
+
+    Pass ``cache=True`` for GETs that may be answered from the on-disk response
+    cache when it is enabled with ``--cache`` or ``--cache-ttl``. An
+    ``idempotency_key`` is sent as the ``Idempotency-Key`` header and makes a
+    POST safe to retry.
+    """
+    # Copy so callers can share one headers dict across concurrent requests
+    kwargs["headers"] = {
+        **(kwargs.get("headers") or {}),
+        "Content-Type": "application/json",
+    }
+    if idempotency_key:
+        kwargs["headers"]["Idempotency-Key"] = idempotency_key
 
     # Use basic auth for publisher endpoints, bearer token for others
     if "/app-registry/api/publishers/" in url:
@@ -20,51 +92,110 @@ def make_request(method, url, **kwargs):
             "Authorization"
         ] = f"Bearer {click.get_current_context().obj['PEEK_API_TOKEN']}"
 
-    try:
-        response = requests.request(method, url, **kwargs)
+    obj = click.get_current_context().obj
+    response_cache = obj.get("CACHE") if cache and method == "GET" else None
+    if response_cache is None:
+        return _send(method, url, **kwargs)
+    return _cached_get(obj, response_cache, url, **kwargs)
+
+
+def _cached_get(obj, response_cache, url, **kwargs):
+    """GET through the response cache, revalidating with ETag/Last-Modified."""
+    # Key on the full URL so pages and filters of one endpoint don't collide
+    full_url = requests.Request("GET", url, params=kwargs.get("params")).prepare().url
+    key = response_cache.key(obj.get("ENV"), full_url, obj.get("PEEK_API_TOKEN"))
+    entry = response_cache.get(key)
+    if entry:
+        meta, body = entry
+        ttl = obj.get("CACHE_TTL")
+        if ttl and time.time() - meta["stored_at"] < ttl:
+            response_cache.hits += 1
+            _trace_cache(url, "hit")
+            return cached_response(meta, body)
+        if "ETag" in meta["headers"]:
+            kwargs["headers"]["If-None-Match"] = meta["headers"]["ETag"]
+        if "Last-Modified" in meta["headers"]:
+            kwargs["headers"]["If-Modified-Since"] = meta["headers"]["Last-Modified"]
+
+    response = _send("GET", url, **kwargs)
+
+    if response.status_code == 304 and entry:
+        response_cache.revalidated += 1
+        response_cache.refresh(key, meta)
+        _trace_cache(url, "revalidated")
+        return cached_response(meta, body)
 
-        # Try to get error message from response
-        error_msg = None
-        if response.status_code >= 400:
+    response_cache.misses += 1
+    _trace_cache(url, "miss")
+    if response.status_code == 200:
+        response_cache.put(key, response)
+    return response
+
+
+def _send(method, url, **kwargs):
+    """Send a request on the shared session, mapping failures to ClickExceptions.
+
+    Connection errors, timeouts and retryable statuses (429/5xx) are retried
+    according to ``ctx.obj["RETRY_POLICY"]``, but only for idempotent methods or
+    requests carrying an ``Idempotency-Key`` header.
+    """
+    obj = click.get_current_context().obj
+    policy = obj.get("RETRY_POLICY") or RetryPolicy(max_retries=0)
+    retryable = policy.can_retry(method, kwargs.get("headers"))
+    kwargs.setdefault("timeout", obj.get("TIMEOUT"))
+
+    limiter_key = f"registry:{obj.get('ENV')}"
+    attempt = 1
+    try:
+        while True:
+            limiter = throttle("registry", limiter_key)
+            reset_connect_time()
+            start = time.perf_counter()
             try:
-                error_data = response.json()
-                error_msg = (
-                    error_data.get("error")
-                    or error_data.get("message")
-                    or str(error_data)
+                response = get_session(url).request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                _trace_http(method, url, None, start, attempt, error=type(e).__name__)
+                if not retryable or attempt >= policy.max_attempts:
+                    raise
+                response = None
+                reason = type(e).__name__
+            else:
+                _trace_http(method, url, response, start, attempt, kwargs.get("stream"))
+                if limiter and response.status_code == 429:
+                    report_throttled(limiter, limiter_key)
+                elif limiter:
+                    limiter.succeeded()
+                if (
+                    not retryable
+                    or attempt >= policy.max_attempts
+                    or response.status_code not in RETRYABLE_STATUS_CODES
+                ):
+                    break
+                reason = f"status {response.status_code}"
+                trace_body_read(response)
+                response.close()
+
+            delay = policy.delay(attempt, response)
+            tracer = get_tracer()
+            if tracer:
+                tracer.record(
+                    {
+                        "type": "retry",
+                        "method": method,
+                        "url": url,
+                        "attempt": attempt,
+                        "reason": reason,
+                        "delay_ms": round(delay * 1000, 2),
+                    }
+                )
+            if obj.get("VERBOSE"):
+                click.echo(
+                    f"Retrying {method} {url} after {reason} "
+                    f"(attempt {attempt + 1}/{policy.max_attempts}) in {delay:.2f}s",
+                    err=True,
                 )
-            except (ValueError, AttributeError):
-                error_msg = response.text if response.text else None
-
-        if response.status_code == 401:
-            msg = "Authentication failed. Please check your credentials."
-            if error_msg:
-                msg += f" Error: {error_msg}"
-            raise click.ClickException(msg)
-        elif response.status_code == 403:
-            msg = "Permission denied. You don't have access to this resource."
-            if error_msg:
-                msg += f" Error: {error_msg}"
-            raise click.ClickException(msg)
-        elif response.status_code == 404:
-            msg = "Resource not found. Please check the URL and try again."
-            if error_msg:
-                msg += f" Error: {error_msg}"
-            raise click.ClickException(msg)
-        elif response.status_code >= 400 and response.status_code < 500:
-            msg = f"Request failed (Status: {response.status_code})"
-            if error_msg:
-                msg += f": {error_msg}"
-            raise click.ClickException(msg)
-        elif response.status_code >= 500:
-            msg = f"Server error occurred (Status: {response.status_code})"
-            if error_msg:
-                msg += f": {error_msg}"
-            msg += ". Please try again later."
-            raise click.ClickException(msg)
-
-        response.raise_for_status()
-        return response
+            time.sleep(delay)
+            attempt += 1
     except requests.ConnectionError:
         raise click.ClickException(
             f"Failed to connect to {url}. Please check your network connection and the server URL."
@@ -74,6 +205,84 @@ def make_request(method, url, **kwargs):
     except requests.RequestException as e:
         raise click.ClickException(f"Request failed: {str(e)}")
 
+    if response.status_code == 304:
+        trace_body_read(response, 0)
+    return _check_response(response)
+
+
+def _trace_http(method, url, response, start, attempt, stream=False, error=None):
+    """Record one HTTP attempt in the ``--trace`` output."""
+    tracer = get_tracer()
+    if tracer is None:
+        return
+    duration = time.perf_counter() - start
+    fields = {"attempt": attempt, "connect_ms": round(connect_time() * 1000, 2)}
+    status = None
+    if response is not None:
+        status = response.status_code
+        body = response.request.body or b""
+        fields["bytes_out"] = len(body)
+        fields["ttfb_ms"] = round(response.elapsed.total_seconds() * 1000, 2)
+        if stream:
+            # The body is read later (e.g. page by page), see trace_body_read
+            tracer.defer_http(response, method, url, start, **fields)
+            return
+        fields["bytes_in"] = len(response.content)
+    if error:
+        fields["error"] = error
+    tracer.record_http(method, url, status, duration, **fields)
+
+
+def _trace_cache(url, result):
+    tracer = get_tracer()
+    if tracer:
+        tracer.record({"type": "cache", "url": url, "result": result})
+
+
+def _check_response(response):
+    """Raise a ClickException describing an error response."""
+    # Try to get error message from response
+    error_msg = None
+    if response.status_code >= 400:
+        trace_body_read(response, len(response.content))
+        try:
+            error_data = response.json()
+            error_msg = (
+                error_data.get("error") or error_data.get("message") or str(error_data)
+            )
+        except (ValueError, AttributeError):
+            error_msg = response.text if response.text else None
+
+    if response.status_code == 401:
+        msg = "Authentication failed. Please check your credentials."
+        if error_msg:
+            msg += f" Error: {error_msg}"
+        raise click.ClickException(msg)
+    elif response.status_code == 403:
+        msg = "Permission denied. You don't have access to this resource."
+        if error_msg:
+            msg += f" Error: {error_msg}"
+        raise click.ClickException(msg)
+    elif response.status_code == 404:
+        msg = "Resource not found. Please check the URL and try again."
+        if error_msg:
+            msg += f" Error: {error_msg}"
+        raise click.ClickException(msg)
+    elif response.status_code >= 400 and response.status_code < 500:
+        msg = f"Request failed (Status: {response.status_code})"
+        if error_msg:
+            msg += f": {error_msg}"
+        raise click.ClickException(msg)
+    elif response.status_code >= 500:
+        msg = f"Server error occurred (Status: {response.status_code})"
+        if error_msg:
+            msg += f": {error_msg}"
+        msg += ". Please try again later."
+        raise click.ClickException(msg)
+
+    response.raise_for_status()
+    return response
+
 
 def get_auth():
     """Get authentication credentials from environment variables."""
@@ -11,7 +11,7 @@ setup(
     ],
     entry_points={
         "console_scripts": [
-            "peek=cli:cli",
+            "peek=cli:main",
         ],
     },
 )
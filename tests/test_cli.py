@@ -1,7 +1,14 @@
+import os
+import subprocess
+import sys
+import time
+import types
 import pytest
+import requests
 import responses
+import click
 from click.testing import CliRunner
-from cli import cli
+from cli import ENVIRONMENTS, cli
 import json
 
 
@@ -10,6 +17,12 @@ def runner():
     return CliRunner()
 
 
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    # Keep the response cache and extendables index out of the real home dir
+    monkeypatch.setenv("PEEK_CACHE_DIR", str(tmp_path / "cache"))
+
+
 @responses.activate
 def test_apps_publishers_create(runner, monkeypatch):
     # Mock environment variables
@@ -620,3 +633,1590 @@ def test_extendables_new_missing_name(runner):
     result = runner.invoke(cli, ["--env", "local", "apps", "extendables", "new"])
     assert result.exit_code != 0
     assert "Missing option '--name'" in result.output
+
+
+REGISTRY_COMMANDS = [
+    ["apps", "list"],
+    ["apps", "create", "--name", "My App"],
+    ["apps", "versions", "list", "--app-id", "123"],
+    ["apps", "extendables", "list"],
+    ["apps", "publishers", "create", "--help"],
+    ["apps", "--help"],
+]
+
+
+@pytest.mark.parametrize("args", REGISTRY_COMMANDS)
+def test_registry_commands_do_not_import_gcp(args):
+    # Run in a fresh interpreter so modules imported by other tests don't leak in.
+    script = (
+        "import sys\n"
+        "from click.testing import CliRunner\n"
+        "from cli import cli\n"
+        f"CliRunner().invoke(cli, {args!r})\n"
+        "loaded = [m for m in sys.modules if m.split('.')[0] in ('google', 'grpc')]\n"
+        "print(','.join(loaded))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env={**os.environ, "PEEK_API_TOKEN": ""},
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == ""
+
+
+def test_help_lists_lazy_commands(runner):
+    result = runner.invoke(cli, ["apps", "--help"])
+    assert result.exit_code == 0
+    for name in ["create", "extendables", "list", "publishers", "services", "versions"]:
+        assert name in result.output
+
+
+@responses.activate
+def test_requests_share_one_session_per_host(runner, monkeypatch):
+    api_token = "test_token"
+    app_id = "123"
+    version = "1.0.0"
+    url = (
+        f"http://noreaga.peek.stack/app-registry/api/apps/{app_id}/versions/{version}/"
+    )
+
+    responses.add(responses.GET, url, json={"data": {"extendables": []}}, status=200)
+    responses.add(responses.PUT, url, json={"data": {}}, status=200)
+    monkeypatch.setattr("click.edit", lambda text, extension: text)
+    monkeypatch.setattr("click.confirm", lambda prompt: True)
+
+    closed = []
+    original_close = requests.Session.close
+
+    def tracking_close(session):
+        closed.append(session)
+        original_close(session)
+
+    monkeypatch.setattr(requests.Session, "close", tracking_close)
+
+    sessions = {}
+    result = runner.invoke(
+        cli,
+        [
+            "--env",
+            "local",
+            "--api-token",
+            api_token,
+            "apps",
+            "versions",
+            "edit",
+            "--app-id",
+            app_id,
+            "--version",
+            version,
+        ],
+        obj={"SESSIONS": sessions},
+    )
+    assert result.exit_code == 0
+    # A caller-provided registry keeps its one pooled session open
+    assert list(sessions) == ["http://noreaga.peek.stack"]
+    assert closed == []
+
+    result = runner.invoke(
+        cli,
+        [
+            "--env",
+            "local",
+            "--api-token",
+            api_token,
+            "apps",
+            "versions",
+            "edit",
+            "--app-id",
+            app_id,
+            "--version",
+            version,
+        ],
+    )
+    assert result.exit_code == 0
+    assert len(closed) == 1
+
+
+@responses.activate
+def test_apps_list_cache_revalidates_with_etag(runner, monkeypatch, tmp_path):
+    monkeypatch.setenv("PEEK_CACHE_DIR", str(tmp_path))
+    url = "http://noreaga.peek.stack/app-registry/api/apps/"
+
+    responses.add(
+        responses.GET,
+        url,
+        json={"data": [{"id": 1, "name": "Cached App"}]},
+        headers={"ETag": '"v1"'},
+        status=200,
+    )
+    responses.add(
+        responses.GET,
+        url,
+        status=304,
+        match=[responses.matchers.header_matcher({"If-None-Match": '"v1"'})],
+    )
+
+    args = ["--env", "local", "--api-token", "test_token", "--cache", "apps", "list"]
+    first = runner.invoke(cli, args)
+    second = runner.invoke(cli, args)
+
+    assert first.exit_code == 0
+    assert second.exit_code == 0, second.output
+    assert len(responses.calls) == 2
+    assert "Cached App" in second.output
+
+
+@responses.activate
+def test_apps_list_cache_ttl_skips_network(runner, monkeypatch, tmp_path):
+    monkeypatch.setenv("PEEK_CACHE_DIR", str(tmp_path))
+    responses.add(
+        responses.GET,
+        "http://noreaga.peek.stack/app-registry/api/apps/",
+        json={"data": [{"id": 1, "name": "Cached App"}]},
+        status=200,
+    )
+
+    args = ["--env", "local", "--api-token", "test_token", "--cache-ttl", "60"]
+    runner.invoke(cli, args + ["apps", "list"])
+    result = runner.invoke(cli, args + ["apps", "list"])
+    assert result.exit_code == 0
+    assert "Cached App" in result.output
+    assert len(responses.calls) == 1
+
+    # A different token must not see the cached entry
+    other = ["--env", "local", "--api-token", "other", "--cache-ttl", "60"]
+    runner.invoke(cli, other + ["apps", "list"])
+    assert len(responses.calls) == 2
+
+    result = runner.invoke(cli, ["cache", "stats"])
+    assert "Entries: 2" in result.output
+    result = runner.invoke(cli, ["cache", "clear"])
+    assert "Removed 2 cached responses." in result.output
+
+
+@responses.activate
+def test_get_retries_transient_errors(runner, monkeypatch):
+    sleeps = []
+    monkeypatch.setattr("cli.utils.time.sleep", sleeps.append)
+    url = "http://noreaga.peek.stack/app-registry/api/apps/"
+    responses.add(responses.GET, url, status=503, headers={"Retry-After": "2"})
+    responses.add(responses.GET, url, body=requests.ConnectionError("reset"))
+    responses.add(responses.GET, url, json={"data": []}, status=200)
+
+    result = runner.invoke(
+        cli, ["--env", "local", "--api-token", "test_token", "-v", "apps", "list"]
+    )
+    assert result.exit_code == 0, result.output
+    assert len(responses.calls) == 3
+    assert sleeps[0] == 2.0
+    assert "Retrying GET" in result.output
+
+    # A Retry-After longer than --retry-max-delay is capped
+    sleeps.clear()
+    responses.add(responses.GET, url, status=429, headers={"Retry-After": "3600"})
+    responses.add(responses.GET, url, json={"data": []}, status=200)
+    result = runner.invoke(
+        cli,
+        ["--env", "local", "--api-token", "test_token"]
+        + ["--retry-max-delay", "5", "apps", "list"],
+    )
+    assert result.exit_code == 0, result.output
+    assert sleeps == [5.0]
+
+
+@responses.activate
+def test_post_is_not_retried_without_idempotency_key(runner, monkeypatch):
+    monkeypatch.setattr("cli.utils.time.sleep", lambda delay: None)
+    url = "http://noreaga.peek.stack/app-registry/api/apps/"
+    responses.add(responses.POST, url, status=503)
+    responses.add(responses.POST, url, json={"id": 1}, status=201)
+
+    args = ["--env", "local", "--api-token", "test_token", "apps", "create"]
+    result = runner.invoke(cli, args + ["--name", "My App"])
+    assert result.exit_code != 0
+    assert len(responses.calls) == 1
+
+    responses.reset()
+    responses.add(
+        responses.POST,
+        url,
+        status=503,
+        match=[responses.matchers.header_matcher({"Idempotency-Key": "abc"})],
+    )
+    responses.add(responses.POST, url, json={"id": 1}, status=201)
+    result = runner.invoke(cli, args + ["--name", "My App", "--idempotency-key", "abc"])
+    assert result.exit_code == 0, result.output
+    assert len(responses.calls) == 2
+
+
+@responses.activate
+def test_trace_writes_json_lines(runner, tmp_path):
+    trace_file = tmp_path / "trace.ndjson"
+    body = json.dumps({"data": [{"id": "1"}] * 100})
+    responses.add(
+        responses.GET,
+        "http://noreaga.peek.stack/app-registry/api/apps/123/versions/",
+        body=body,
+        status=200,
+        content_type="application/json",
+        auto_calculate_content_length=False,
+    )
+
+    result = runner.invoke(
+        cli,
+        [
+            "--env",
+            "local",
+            "--api-token",
+            "test_token",
+            "--trace",
+            str(trace_file),
+            "--output",
+            "ndjson",
+            "apps",
+            "versions",
+            "list",
+            "--app-id",
+            "123",
+        ],
+    )
+    assert result.exit_code == 0
+
+    events = [json.loads(line) for line in trace_file.read_text().splitlines()]
+    http, summary = events
+    assert http["type"] == "http"
+    assert http["method"] == "GET"
+    assert http["url"] == "/app-registry/api/apps/{app_id}/versions/"
+    assert http["status"] == 200
+    # Streamed pages are recorded once their body has been read
+    assert http["bytes_in"] == len(body)
+    assert "body" not in http
+    assert summary["type"] == "summary"
+    assert summary["command"] == "apps versions list"
+    assert summary["http_calls"] == 1
+
+
+@responses.activate
+def test_versions_list_all_apps(runner):
+    base = "http://noreaga.peek.stack/app-registry/api/apps/"
+    responses.add(
+        responses.GET, base, json={"data": [{"id": "a1"}, {"id": "a2"}]}, status=200
+    )
+    responses.add(
+        responses.GET,
+        base + "a1/versions/",
+        json={"data": [{"display_version": "1.0.0"}]},
+        status=200,
+    )
+    responses.add(
+        responses.GET, base + "a2/versions/", json={"error": "boom"}, status=404
+    )
+
+    result = runner.invoke(
+        cli,
+        [
+            "--env",
+            "local",
+            "--api-token",
+            "test_token",
+            "apps",
+            "versions",
+            "list",
+            "--all-apps",
+            "--concurrency",
+            "2",
+        ],
+    )
+    assert result.exit_code != 0
+    assert "Versions for app a1" in result.output
+    assert "1.0.0" in result.output
+    assert "Error listing versions for app a2" in result.output
+    assert "Failed to list versions for 1 of 2 apps" in result.output
+
+
+@responses.activate
+def test_versions_list_all_apps_filters_json_output(runner):
+    base = "http://noreaga.peek.stack/app-registry/api/apps/"
+    responses.add(responses.GET, base, json={"data": [{"id": "a1"}]})
+    versions = responses.add(
+        responses.GET,
+        base + "a1/versions/",
+        json={
+            "data": [
+                {"id": "v1", "display_version": "1.0.0", "status": "published"},
+                {"id": "v2", "display_version": "2.0.0", "status": "draft"},
+            ]
+        },
+    )
+
+    result = runner.invoke(
+        cli,
+        [
+            "--env",
+            "local",
+            "--api-token",
+            "test_token",
+            "apps",
+            "versions",
+            "list",
+            "--all-apps",
+            "--where",
+            "status=published",
+            "--fields",
+            "id",
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    assert '"v1"' in result.output
+    assert "v2" not in result.output
+    assert "1.0.0" not in result.output
+    assert "filter%5Bstatus%5D=published" in versions.calls[0].request.url
+
+
+@responses.activate
+def test_versions_publish_from_file_with_resume(runner, tmp_path):
+    base = "http://noreaga.peek.stack/app-registry/api/apps"
+    items = tmp_path / "items.csv"
+    items.write_text("app_id,version\na1,v1\na2,v2\na3,v3\n")
+    checkpoint = tmp_path / "checkpoint.ndjson"
+    checkpoint.write_text(json.dumps({"app_id": "a1", "version": "v1"}) + "\n")
+
+    responses.add(responses.POST, f"{base}/a2/versions/v2/publish", json={}, status=200)
+    responses.add(responses.POST, f"{base}/a3/versions/v3/publish", json={}, status=422)
+
+    result = runner.invoke(
+        cli,
+        [
+            "--env",
+            "local",
+            "--api-token",
+            "test_token",
+            "apps",
+            "versions",
+            "publish",
+            "--from",
+            str(items),
+            "--resume",
+            str(checkpoint),
+        ],
+    )
+    assert result.exit_code != 0
+    assert len(responses.calls) == 2
+    records = {
+        record["app_id"]: record["status"]
+        for record in map(json.loads, result.output.splitlines()[:3])
+    }
+    assert records == {"a1": "skipped", "a2": "published", "a3": "failed"}
+    assert "Failed to publish 1 of 2 versions" in result.output
+    assert checkpoint.read_text().splitlines()[-1] == json.dumps(
+        {"app_id": "a2", "version": "v2"}
+    )
+
+
+@pytest.mark.parametrize(
+    "content, line",
+    [
+        ('{"app_id": "a1", "version": "v1"}\n{"app_id": "a2"\n', 2),
+        ('{"app_id": "a1", "version": "v1"}\n\n{"app_id": "a2"}\n', 3),
+        ("app_id,version\na1,v1\na2\n", 3),
+    ],
+)
+def test_versions_publish_from_file_reports_bad_lines(runner, tmp_path, content, line):
+    items = tmp_path / "items"
+    items.write_text(content)
+    result = runner.invoke(
+        cli,
+        ["--api-token", "t", "apps", "versions", "publish", "--from", str(items)],
+    )
+    assert result.exit_code == 1
+    assert f"Invalid line {line} in {items}" in result.output
+
+
+@responses.activate
+def test_extendables_new_multiple_names(runner, monkeypatch):
+    app_id = "123"
+    version = "1.0.0"
+    version_url = (
+        f"http://noreaga.peek.stack/app-registry/api/apps/{app_id}/versions/{version}/"
+    )
+    responses.add(
+        responses.GET,
+        "http://noreaga.peek.stack/app-registry/api/extendables",
+        json={
+            "data": [
+                {"slug": "first@v1", "configuration": {}},
+                {"slug": "second@v1", "configuration": {}},
+                {"slug": "unused@v1", "configuration": {}},
+            ]
+        },
+        status=200,
+    )
+    responses.add(
+        responses.GET,
+        version_url,
+        json={"data": {"description": "Current version", "extendables": []}},
+        status=200,
+    )
+    responses.add(responses.PUT, version_url, json={"data": {}}, status=200)
+    monkeypatch.setattr("click.edit", lambda text, extension: text)
+    monkeypatch.setattr("click.confirm", lambda prompt: True)
+
+    result = runner.invoke(
+        cli,
+        [
+            "--env",
+            "local",
+            "--api-token",
+            "test_token",
+            "apps",
+            "extendables",
+            "new",
+            "--name",
+            "first@v1",
+            "--name",
+            "second@v1",
+            "--app-id",
+            app_id,
+            "--version",
+            version,
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    puts = [call for call in responses.calls if call.request.method == "PUT"]
+    assert len(puts) == 1
+    configured = json.loads(puts[0].request.body)["app_version"][
+        "configured_extendables"
+    ]
+    assert [item["extendable_slug"] for item in configured] == [
+        "first@v1",
+        "second@v1",
+    ]
+
+
+@responses.activate
+def test_extendables_show_uses_local_index(runner):
+    catalogue_url = "http://noreaga.peek.stack/app-registry/api/extendables"
+    responses.add(
+        responses.GET,
+        catalogue_url,
+        json={"data": [{"slug": "webhook@v1", "name": "Webhook"}]},
+        headers={"ETag": '"cat-1"'},
+        status=200,
+    )
+    responses.add(
+        responses.GET,
+        catalogue_url,
+        status=304,
+        match=[responses.matchers.header_matcher({"If-None-Match": '"cat-1"'})],
+    )
+    args = ["--env", "local", "--api-token", "test_token", "apps", "extendables"]
+
+    result = runner.invoke(cli, args + ["show", "--name", "webhook@v1"])
+    assert result.exit_code == 0
+    assert "Webhook" in result.output
+
+    # A fresh index answers without the network
+    result = runner.invoke(cli, args + ["show", "--name", "webhook@v1"])
+    assert result.exit_code == 0
+    assert len(responses.calls) == 1
+
+    # --refresh revalidates; a 304 keeps the index
+    result = runner.invoke(cli, args + ["show", "--name", "webhook@v1", "--refresh"])
+    assert result.exit_code == 0
+    assert "Webhook" in result.output
+    assert len(responses.calls) == 2
+
+    result = runner.invoke(cli, args + ["show", "--name", "missing@v1"])
+    assert result.exit_code != 0
+    assert "Extendable missing@v1 not found" in result.output
+
+
+@responses.activate
+def test_extendables_index_reads_every_page(runner):
+    catalogue_url = "http://noreaga.peek.stack/app-registry/api/extendables"
+    responses.add(
+        responses.GET,
+        catalogue_url,
+        json={"data": [{"slug": "a@v1"}], "meta": {"after": "c1"}},
+        match=[responses.matchers.query_param_matcher({})],
+    )
+    responses.add(
+        responses.GET,
+        catalogue_url,
+        json={"data": [{"slug": "b@v1", "name": "Second page"}], "meta": {}},
+        match=[responses.matchers.query_param_matcher({"after": "c1"})],
+    )
+    args = ["--env", "local", "--api-token", "test_token", "apps", "extendables"]
+
+    result = runner.invoke(cli, args + ["show", "--name", "b@v1"])
+    assert result.exit_code == 0, result.output
+    assert "Second page" in result.output
+
+
+def test_extendables_name_completion(runner, monkeypatch):
+    from cli.extendables_index import ExtendablesIndex
+
+    index = ExtendablesIndex("stage")
+    index.data["extendables"] = {"webhook@v1": {}, "widget@v1": {}, "other@v1": {}}
+    index._save()
+
+    result = runner.invoke(
+        cli,
+        [],
+        prog_name="peek",
+        env={
+            "_PEEK_COMPLETE": "bash_complete",
+            "COMP_WORDS": "peek --env stage apps extendables show --name w",
+            "COMP_CWORD": "7",
+        },
+    )
+    assert "webhook@v1" in result.output
+    assert "widget@v1" in result.output
+    assert "other@v1" not in result.output
+
+
+@pytest.mark.parametrize(
+    "output, expected",
+    [
+        ("ndjson", '{"id":1,"name":"First"}\n{"id":2,"name":"Second"}\n'),
+        ("table", "ID  NAME\n1   First\n2   Second\n"),
+        (
+            "raw",
+            '{"data": [{"id": 1, "name": "First"}, {"id": 2, "name": "Second"}]}',
+        ),
+    ],
+)
+@responses.activate
+def test_apps_list_output_formats(runner, output, expected):
+    responses.add(
+        responses.GET,
+        "http://noreaga.peek.stack/app-registry/api/apps/",
+        json={"data": [{"id": 1, "name": "First"}, {"id": 2, "name": "Second"}]},
+        status=200,
+    )
+    result = runner.invoke(
+        cli,
+        ["--api-token", "test_token", "--output", output, "apps", "list"],
+    )
+    assert result.exit_code == 0
+    assert result.output == expected
+
+
+def test_data_array_parser_handles_split_chunks():
+    from cli.output import DataArrayParser
+
+    document = json.dumps(
+        {"meta": {"data": [0]}, "data": [{"a": 'x"]}', "b": [1, {}]}, 2, None]}
+    )
+    parser = DataArrayParser()
+    records = []
+    for i in range(len(document)):
+        records.extend(parser.feed(document[i]))
+    records.extend(parser.close())
+    assert records == [{"a": 'x"]}', "b": [1, {}]}, 2, None]
+
+
+@responses.activate
+def test_apps_list_follows_page_numbers(runner):
+    url = "http://noreaga.peek.stack/app-registry/api/apps/"
+    for page in (1, 2, 3):
+        params = (
+            {"page_size": "2"} if page == 1 else {"page_size": "2", "page": str(page)}
+        )
+        responses.add(
+            responses.GET,
+            url,
+            json={
+                "data": [{"id": page * 10 + 1}, {"id": page * 10 + 2}],
+                "meta": {"page_number": page, "total_pages": 3},
+            },
+            match=[responses.matchers.query_param_matcher(params)],
+        )
+
+    args = ["--api-token", "test_token", "--output", "ndjson", "apps", "list"]
+    result = runner.invoke(cli, args + ["--page-size", "2"])
+    assert result.exit_code == 0, result.output
+    assert [json.loads(line)["id"] for line in result.output.splitlines()] == [
+        11,
+        12,
+        21,
+        22,
+        31,
+        32,
+    ]
+
+    result = runner.invoke(cli, args + ["--page-size", "2", "--limit", "3"])
+    assert [json.loads(line)["id"] for line in result.output.splitlines()] == [
+        11,
+        12,
+        21,
+    ]
+
+
+@responses.activate
+def test_extendables_list_follows_cursor(runner):
+    url = "http://noreaga.peek.stack/app-registry/api/extendables/"
+    responses.add(
+        responses.GET,
+        url,
+        json={"data": [{"slug": "a@v1"}], "meta": {"after": "c1"}},
+        match=[responses.matchers.query_param_matcher({})],
+    )
+    responses.add(
+        responses.GET,
+        url,
+        json={"data": [{"slug": "b@v1"}], "meta": {"after": None}},
+        match=[responses.matchers.query_param_matcher({"after": "c1"})],
+    )
+
+    result = runner.invoke(
+        cli, ["--api-token", "test_token", "apps", "extendables", "list"]
+    )
+    assert result.exit_code == 0, result.output
+    document = json.loads(result.output[len("Extendables: ") :])
+    assert document == {"data": [{"slug": "a@v1"}, {"slug": "b@v1"}]}
+
+
+@responses.activate
+def test_apps_list_fields_and_where(runner):
+    responses.add(
+        responses.GET,
+        "http://noreaga.peek.stack/app-registry/api/apps/",
+        json={
+            "data": [
+                {"id": 1, "name": "One", "active": True, "extendables": []},
+                {
+                    "id": 2,
+                    "name": "Two",
+                    "active": True,
+                    "extendables": [{"slug": "webhook@v1"}],
+                },
+                {
+                    "id": 3,
+                    "name": "Three",
+                    "active": False,
+                    "extendables": [{"slug": "webhook@v1"}],
+                },
+            ]
+        },
+        match=[
+            responses.matchers.query_param_matcher(
+                {"fields": "id,name,extendables,active", "filter[active]": "true"}
+            )
+        ],
+    )
+
+    result = runner.invoke(
+        cli,
+        [
+            "--api-token",
+            "test_token",
+            "--output",
+            "ndjson",
+            "apps",
+            "list",
+            "--fields",
+            "id,name",
+            "--where",
+            "extendables.slug=webhook@v1",
+            "--where",
+            "active=true",
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    assert result.output == '{"id":2,"name":"Two"}\n'
+
+
+@responses.activate
+def test_mirror_sync_is_incremental_and_queryable(runner):
+    api = "http://noreaga.peek.stack/app-registry/api"
+    apps = {"data": [{"id": "1", "name": "Test App", "updated_at": "t1"}]}
+    version = {
+        "id": "10",
+        "display_version": "1.0.0",
+        "status": "draft",
+        "extendables": [{"slug": "webhook@v1"}],
+    }
+    unchanged = [responses.matchers.header_matcher({"If-None-Match": '"apps-1"'})]
+    responses.add(responses.GET, f"{api}/apps/", status=304, match=unchanged)
+    responses.add(
+        responses.GET, f"{api}/apps/", json=apps, headers={"ETag": '"apps-1"'}
+    )
+    responses.add(
+        responses.GET,
+        f"{api}/extendables/",
+        json={"data": [{"slug": "webhook@v1", "name": "Webhook"}]},
+    )
+    versions_url = f"{api}/apps/1/versions/"
+    responses.add(
+        responses.GET,
+        versions_url,
+        status=304,
+        match=[responses.matchers.header_matcher({"If-None-Match": '"v-1"'})],
+    )
+    responses.add(
+        responses.GET, versions_url, json={"data": [version]}, headers={"ETag": '"v-1"'}
+    )
+    args = ["--env", "local", "--api-token", "test_token"]
+
+    result = runner.invoke(cli, args + ["mirror", "sync"])
+    assert result.exit_code == 0
+    assert "apps: 1 inserted, 0 updated, 0 deleted" in result.output
+    assert "versions: 1 inserted, 0 updated, 0 deleted" in result.output
+
+    # Apps and the app's versions answer 304
+    calls = len(responses.calls)
+    result = runner.invoke(cli, args + ["mirror", "sync"])
+    assert result.exit_code == 0
+    assert "Mirror is up to date." in result.output
+    assert len(responses.calls) == calls + 3
+
+    # A version published without touching its app is still picked up
+    responses.replace(
+        responses.GET,
+        versions_url,
+        json={"data": [{**version, "status": "published"}]},
+        headers={"ETag": '"v-2"'},
+    )
+    result = runner.invoke(cli, args + ["mirror", "sync"])
+    assert result.exit_code == 0
+    assert "versions: 0 inserted, 1 updated, 0 deleted" in result.output
+
+    result = runner.invoke(
+        cli,
+        args
+        + ["--output", "ndjson", "mirror", "query", "--uses-extendable", "webhook@v1"],
+    )
+    assert result.exit_code == 0
+    assert json.loads(result.output)["app_name"] == "Test App"
+
+    result = runner.invoke(cli, args + ["mirror", "query", "DELETE FROM apps"])
+    assert result.exit_code != 0
+    assert "Query failed" in result.output
+
+    calls = len(responses.calls)
+    result = runner.invoke(
+        cli,
+        args
+        + [
+            "--output",
+            "table",
+            "apps",
+            "versions",
+            "list",
+            "--app-id",
+            "1",
+            "--from-mirror",
+        ],
+    )
+    assert result.exit_code == 0
+    assert "1.0.0" in result.output
+    assert len(responses.calls) == calls
+
+
+@responses.activate
+def test_batch_runs_lines_in_one_process(runner, tmp_path):
+    responses.add(
+        responses.GET,
+        "http://noreaga.peek.stack/app-registry/api/apps/",
+        json={"data": [{"id": "1", "name": "Test App"}]},
+    )
+    commands = tmp_path / "commands.txt"
+    commands.write_text(
+        "# deploy steps\n"
+        "peek --api-token test_token apps list\n"
+        "\n"
+        "apps list\n"
+        "--api-token test_token --output ndjson apps list\n"
+    )
+
+    result = runner.invoke(cli, ["batch", str(commands), "--parallel", "2"])
+    assert result.exit_code == 1
+    assert "1 of 3 commands failed" in result.output
+    records = {
+        record["line"]: record
+        for record in map(json.loads, result.output.splitlines()[:3])
+    }
+    assert records[2]["exit_code"] == 0
+    assert "Test App" in records[2]["stdout"]
+    assert records[4]["exit_code"] == 1
+    assert "API token is required" in records[4]["stderr"]
+    assert records[5]["stdout"] == '{"id":"1","name":"Test App"}\n'
+
+    result = runner.invoke(
+        cli, ["batch", "--fail-fast"], input="apps list\napps list\n"
+    )
+    assert result.exit_code == 1
+    assert len(result.output.splitlines()) == 2  # one record, then the error
+
+    # Global options given before batch apply to every line
+    result = runner.invoke(
+        cli,
+        ["--api-token", "test_token", "--output", "ndjson", "batch"],
+        input="apps list\n--output json apps list\n",
+    )
+    assert result.exit_code == 0, result.output
+    records = [json.loads(line) for line in result.output.splitlines()]
+    assert records[0]["stdout"] == '{"id":"1","name":"Test App"}\n'
+    assert records[1]["stdout"].startswith("Apps:")
+
+    # A line that can't be parsed fails on its own
+    result = runner.invoke(
+        cli, ["--api-token", "test_token", "batch"], input='apps "list\napps list\n'
+    )
+    assert result.exit_code == 1
+    records = {
+        record["line"]: record
+        for record in map(json.loads, result.output.splitlines()[:2])
+    }
+    assert records[1]["exit_code"] == 2
+    assert "No closing quotation" in records[1]["stderr"]
+    assert records[2]["exit_code"] == 0
+    assert "1 of 2 commands failed" in result.output
+
+
+def test_agent_start_outside_the_checkout(runner, monkeypatch, tmp_path):
+    import tempfile
+    from cli.agent import request
+
+    path = os.path.join(tempfile.mkdtemp(prefix="peek-"), "agent.sock")
+    monkeypatch.setenv("PEEK_AGENT_SOCKET", path)
+    monkeypatch.chdir(tmp_path)
+    result = runner.invoke(cli, ["agent", "start", "--idle-timeout", "30"])
+    assert result.exit_code == 0, result.output
+    assert "Agent started" in result.output
+    request({"op": "stop"})
+
+
+@responses.activate
+def test_agent_runs_forwarded_commands(monkeypatch, capsys):
+    import tempfile
+    import threading
+    from cli.agent import Agent, forward, request
+
+    path = os.path.join(tempfile.mkdtemp(prefix="peek-"), "agent.sock")
+    monkeypatch.setenv("PEEK_AGENT_SOCKET", path)
+    monkeypatch.setattr(sys.stdin, "isatty", lambda: False, raising=False)
+    responses.add(
+        responses.GET,
+        "http://noreaga.peek.stack/app-registry/api/apps/",
+        json={"data": [{"id": "1", "name": "Test App"}]},
+    )
+    agent = Agent(cli, idle_timeout=60)
+    thread = threading.Thread(target=agent.serve, daemon=True)
+    thread.start()
+    for _ in range(100):
+        if os.path.exists(path):
+            break
+        time.sleep(0.01)
+    assert oct(os.stat(path).st_mode & 0o777) == "0o600"
+
+    args = ["--api-token", "test_token", "--output", "ndjson", "apps", "list"]
+    assert forward(args) == 0
+    assert forward(args) == 0
+    assert capsys.readouterr().out == '{"id":"1","name":"Test App"}\n' * 2
+
+    status = request({"op": "status"})
+    assert status["commands"] == 2
+    assert status["http_requests"] == 2
+    assert status["latency_ms"]["p50"] is not None
+
+    # A caller with a different environment runs the command itself
+    for name, value in [("PEEK_OUTPUT", "table"), ("GCP_REGION", "europe-west1")]:
+        with monkeypatch.context() as env:
+            env.setenv(name, value)
+            assert forward(args) is None
+    assert forward(["batch", "-"]) is None
+    # Commands reading the caller's stdin run locally too
+    assert forward(args[:2] + ["apps", "versions", "publish", "--from", "-"]) is None
+    assert forward(args[:2] + ["services", "delete", "--from=-"]) is None
+    assert request({"op": "status"})["fallbacks"] == 2
+
+    # A prompting command answered through a pipe runs in this process
+    import io
+    from cli import main
+
+    url = "http://noreaga.peek.stack/app-registry/api/apps/1/versions/1/"
+    responses.add(responses.GET, url, json={"data": {"extendables": []}})
+    responses.add(responses.PUT, url, json={"data": {}})
+    monkeypatch.setattr("click.edit", lambda text, extension: text)
+    monkeypatch.setattr(sys, "stdin", io.StringIO("y\n"))
+    monkeypatch.setattr(sys, "argv", ["peek"] + args[:2] + ["apps", "versions", "edit"])
+    sys.argv += ["--app-id", "1", "--version", "1"]
+    with pytest.raises(SystemExit) as exit_info:
+        main()
+    assert exit_info.value.code in (None, 0)
+    assert responses.calls[-1].request.method == "PUT"
+    assert "Version updated successfully" in capsys.readouterr().out
+    status = request({"op": "status"})
+    assert (status["commands"], status["fallbacks"]) == (2, 2)
+
+    request({"op": "stop"})
+    thread.join(timeout=5)
+    assert not os.path.exists(path)
+    assert forward(args) is None
+
+
+def test_gcp_clients_resolve_credentials_once(monkeypatch):
+    from google.auth.credentials import AnonymousCredentials
+    from cli import gcp
+
+    calls = []
+
+    def fake_default():
+        calls.append(1)
+        return AnonymousCredentials(), "test-project"
+
+    monkeypatch.setattr(gcp, "default", fake_default)
+    monkeypatch.setattr(gcp, "_clients", None)
+    monkeypatch.setenv("GCP_REGION", "us-central1")
+
+    first = gcp.CloudRunServiceManager()
+    second = gcp.CloudRunServiceManager()
+    assert first.client is second.client
+    assert first.parent == "projects/test-project/locations/us-central1"
+    assert gcp.get_clients().run() is first.client
+    assert len(calls) == 1
+
+
+def test_services_wait_polls_operations_together(runner, monkeypatch):
+    from cli import gcp
+
+    class FakeOperation:
+        def __init__(self, clients, name):
+            self.name = name
+            self.polls = 0
+
+        def done(self):
+            self.polls += 1
+            return self.polls >= 2
+
+        def result(self):
+            if "bad" in self.name:
+                raise click.ClickException("build step failed")
+            return self.name
+
+    monkeypatch.setattr(gcp, "OperationRef", FakeOperation)
+    monkeypatch.setattr(gcp, "get_clients", lambda: None)
+    monkeypatch.setattr(gcp.time, "sleep", lambda seconds: None)
+
+    result = runner.invoke(
+        cli, ["apps", "services", "wait", "operations/build/p/ok", "operations/bad"]
+    )
+    assert result.exit_code == 1
+    assert "operations/build/p/ok: done after" in result.output
+    assert "operations/bad: failed after" in result.output
+    assert "build step failed" in result.output
+    assert "1 of 2 operations failed" in result.output
+
+    # Access create --no-wait could not grant yet is granted after waiting
+    granted = []
+    monkeypatch.setattr(
+        gcp,
+        "get_clients",
+        lambda: types.SimpleNamespace(
+            run=lambda: types.SimpleNamespace(
+                set_iam_policy=lambda request: granted.append(request["resource"])
+            )
+        ),
+    )
+    service = "projects/p1/locations/us-central1/services/svc"
+    result = runner.invoke(
+        cli,
+        ["apps", "services", "wait", "--grant-access", service, "operations/ok"],
+    )
+    assert result.exit_code == 0, result.output
+    assert granted == [service]
+    assert f"{service}: public access granted" in result.output
+
+
+@responses.activate
+def test_build_tail_follows_steps_and_logs(capsys):
+    import datetime
+    from google.cloud.devtools import cloudbuild_v1
+    from cli.gcp import BuildTail
+
+    start = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+    build = cloudbuild_v1.Build(
+        id="b-1",
+        steps=[
+            cloudbuild_v1.BuildStep(id="Build", status="SUCCESS"),
+            cloudbuild_v1.BuildStep(id="Push", status="WORKING"),
+        ],
+    )
+    build.steps[0].timing.start_time = start
+    build.steps[0].timing.end_time = start + datetime.timedelta(seconds=42)
+    build.steps[1].timing.start_time = start + datetime.timedelta(seconds=42)
+
+    class FakeClients:
+        project_id = "test-project"
+
+        def build(self):
+            return self
+
+        def get_build(self, project_id, id):
+            assert (project_id, id) == ("test-project", "b-1")
+            return build
+
+        def token(self):
+            return "token"
+
+    entry = {
+        "insertId": "1",
+        "timestamp": "2024-01-01T00:00:01Z",
+        "textPayload": "Step 1/5 : FROM python",
+        "labels": {"build_step": 'Step #0 - "Build"'},
+    }
+    responses.add(responses.POST, BuildTail.ENTRIES_URL, json={"entries": [entry]})
+
+    with click.Context(cli, obj={}):
+        tail = BuildTail(FakeClients(), "b-1")
+        tail.poll()
+        tail.poll()  # the same entry again is not printed twice
+
+    err = capsys.readouterr().err
+    assert err.count("[Build] Step 1/5 : FROM python") == 1
+    assert "[Build] SUCCESS in 42.0s" in err
+    assert "[Push] WORKING\n" in err
+    assert (
+        'timestamp>="2024-01-01T00:00:01Z"'
+        in json.loads(responses.calls[1].request.body)["filter"]
+    )
+    assert tail.summary()[0] == ("Build", "SUCCESS", 42.0)
+
+
+def test_build_tail_stops_following_on_api_errors(monkeypatch, capsys):
+    import google.api_core.exceptions
+    import google.auth.exceptions
+    from google.cloud.devtools import cloudbuild_v1
+    from cli import gcp
+
+    build = cloudbuild_v1.Build(
+        id="b-1", steps=[cloudbuild_v1.BuildStep(id="Build", status="WORKING")]
+    )
+
+    class FakeClients:
+        project_id = "test-project"
+        gets = 0
+
+        def build(self):
+            return self
+
+        def get_build(self, project_id, id):
+            self.gets += 1
+            if self.gets > 1:
+                raise google.api_core.exceptions.ServiceUnavailable("try again")
+            return build
+
+        def token(self):
+            raise google.auth.exceptions.RefreshError("token expired")
+
+    class FakeOperation:
+        name = "operations/build/test-project/op-1"
+        polls = 0
+
+        def done(self):
+            self.polls += 1
+            return self.polls >= 3
+
+        def result(self):
+            return "deployed"
+
+    monkeypatch.setattr(gcp.time, "sleep", lambda seconds: None)
+    clients = FakeClients()
+    with click.Context(cli, obj={}):
+        tail = gcp.BuildTail(clients, "b-1")
+        results = gcp.wait_operations({"build": FakeOperation()}, on_poll=tail.poll)
+        tail.poll()
+
+    assert results["build"]["result"] == "deployed"
+    assert clients.gets == 2
+    err = capsys.readouterr().err
+    assert "Warning: not tailing build logs (token expired)" in err
+    assert "[Build] WORKING" in err
+    assert "Warning: not following the build (503 try again)" in err
+    assert tail.summary() == [("Build", "WORKING", None)]
+
+
+@pytest.mark.parametrize(
+    "build_cache, expected_steps, expected_arg",
+    [
+        ("none", ["Build", "Push", "Deploy"], "--no-cache"),
+        ("registry", ["Pull", "Build", "Push", "Deploy"], "--cache-from"),
+        ("kaniko", ["Build", "Deploy"], "--cache-ttl=24h"),
+    ],
+)
+def test_build_trigger_cache_steps(build_cache, expected_steps, expected_arg):
+    from cli.gcp import CloudBuildTriggerManager
+
+    class FakeClients:
+        project_id = "test-project"
+        region = "us-central1"
+
+        def build(self):
+            return None
+
+    manager = CloudBuildTriggerManager(FakeClients(), "peek-travel", "app", "sa")
+    steps = manager.build_steps("svc", build_cache=build_cache, cache_ttl=24)
+    assert [step.id for step in steps] == expected_steps
+    assert expected_arg in [arg for step in steps for arg in step.args]
+    assert steps[-1].args[4] == f"--image={manager.image}:$COMMIT_SHA"
+
+
+def test_machine_types_are_cloud_build_machine_types():
+    from google.cloud.devtools import cloudbuild_v1
+    from cli.build_options import MACHINE_TYPES
+
+    for machine_type in MACHINE_TYPES:
+        assert cloudbuild_v1.BuildOptions.MachineType[machine_type]
+
+
+def test_services_rollout_canary_then_rest(runner, monkeypatch, tmp_path):
+    from cli import gcp
+
+    class FakeOperation:
+        def __init__(self, name):
+            self.name = name
+
+        def done(self):
+            return True
+
+        def result(self):
+            if self.name == "broken":
+                raise click.ClickException("revision failed to start")
+            return self.name
+
+    updated = []
+
+    class FakeManager:
+        def start_update_image(self, name, image):
+            assert image == "img:2"
+            updated.append(name)
+            return FakeOperation(name)
+
+    monkeypatch.setattr(gcp, "CloudRunServiceManager", FakeManager)
+    monkeypatch.setattr(gcp.time, "sleep", lambda seconds: None)
+    targets = tmp_path / "targets.txt"
+    args = ["apps", "services", "rollout", "--image", "img:2"]
+
+    targets.write_text("# fleet\none\nbroken\nthree\n")
+    result = runner.invoke(cli, args + ["--targets", str(targets), "--parallel", "2"])
+    assert result.exit_code == 1
+    assert sorted(updated) == ["broken", "one", "three"]
+    assert "revision failed to start" in result.output
+    assert "1 of 3 services were not updated" in result.output
+
+    updated.clear()
+    targets.write_text("broken\none\nthree\n")
+    result = runner.invoke(cli, args + ["--targets", str(targets), "--canary", "1"])
+    assert updated == ["broken"]
+    assert "Canary failed" in result.output
+    assert "3 of 3 services were not updated" in result.output
+    rows = [line.split()[:2] for line in result.output.splitlines()]
+    assert ["one", "skipped"] in rows
+
+
+def test_services_list_many_locations(runner, monkeypatch):
+    from google.api_core import exceptions
+    from google.cloud import run_v2
+    from cli import gcp
+
+    class FakeClients:
+        project_id = "p1"
+        region = "us-central1"
+
+        def parent(self, project_id=None, region=None):
+            return f"projects/{project_id}/locations/{region}"
+
+    def fake_locations(clients, project_id):
+        if project_id == "p3":
+            raise requests.HTTPError("403 Forbidden")
+        return ["europe-west1"]
+
+    def fake_list(clients, parent, page_size=None):
+        assert page_size == 50
+        assert parent.endswith("/locations/europe-west1")
+        if parent.startswith("projects/p2"):
+            raise exceptions.PermissionDenied("nope")
+        return [
+            run_v2.Service(
+                name=f"{parent}/services/{name}",
+                uri=f"https://{name}.run.app",
+                labels={"peek-app-id": app_id},
+            )
+            for name, app_id in [("app-a", "1"), ("app-b", "2")]
+        ]
+
+    monkeypatch.setattr(gcp, "get_clients", lambda: FakeClients())
+    monkeypatch.setattr(gcp, "list_locations", fake_locations)
+    monkeypatch.setattr(gcp, "list_services", fake_list)
+
+    result = runner.invoke(
+        cli,
+        ["--output", "ndjson", "apps", "services", "list"]
+        + ["--project", "p1", "--project", "p2", "--project", "p3"]
+        + ["--region", "all"]
+        + ["--label", "peek-app-id=2", "--page-size", "50"],
+    )
+    assert result.exit_code == 1
+    (record,) = [
+        json.loads(line) for line in result.output.splitlines() if line[:1] == "{"
+    ]
+    assert record["name"] == "app-b"
+    assert record["project"] == "p1"
+    assert record["region"] == "europe-west1"
+    assert "Permission denied" in result.output
+    assert "Failed to list Cloud Run regions of project p3" in result.output
+    assert (
+        "Failed to list regions of 1 of 3 projects and services in 1 of 2 locations"
+        in result.output
+    )
+
+
+@responses.activate
+def test_list_locations_follows_pages():
+    from cli import gcp
+
+    url = gcp.RUN_LOCATIONS_URL.format(project_id="p1")
+    responses.add(
+        responses.GET,
+        url,
+        json={"locations": [{"locationId": "us-central1"}], "nextPageToken": "t"},
+        match=[responses.matchers.query_param_matcher({})],
+    )
+    responses.add(
+        responses.GET,
+        url,
+        json={"locations": [{"locationId": "europe-west1"}]},
+        match=[responses.matchers.query_param_matcher({"pageToken": "t"})],
+    )
+    clients = types.SimpleNamespace(token=lambda: "tok")
+    with click.Context(click.Command("test"), obj={}):
+        assert gcp.list_locations(clients, "p1") == ["us-central1", "europe-west1"]
+    assert responses.calls[0].request.headers["Authorization"] == "Bearer tok"
+
+
+def test_services_delete_many_with_one_prompt(runner, monkeypatch, tmp_path):
+    from google.api_core import exceptions
+    from google.cloud import run_v2
+    from cli import gcp
+
+    deleted = []
+
+    class FakeOperation:
+        def __init__(self, name):
+            self.name = name
+
+        def done(self):
+            return True
+
+        def result(self):
+            if self.name.endswith("/gone"):
+                raise exceptions.NotFound("gone")
+
+    class FakeClients:
+        project_id = "p1"
+        region = "us-central1"
+
+        def parent(self):
+            return "projects/p1/locations/us-central1"
+
+        def run(self):
+            return self
+
+        def delete_service(self, name):
+            deleted.append(name.rsplit("/", 1)[-1])
+            return FakeOperation(name)
+
+    def fake_list(clients, parent, page_size=None):
+        return [
+            run_v2.Service(name=f"{parent}/services/preview-1", labels={"env": "pr"}),
+            run_v2.Service(name=f"{parent}/services/prod", labels={"env": "prod"}),
+        ]
+
+    monkeypatch.setattr(gcp, "get_clients", lambda: FakeClients())
+    monkeypatch.setattr(gcp, "list_services", fake_list)
+    monkeypatch.setattr(gcp.time, "sleep", lambda seconds: None)
+    names = tmp_path / "names.txt"
+    names.write_text("gone\n")
+    args = ["apps", "services", "delete", "--name", "App One", "--label", "env=pr"]
+    args += ["--from", str(names)]
+
+    result = runner.invoke(cli, args, input="n\n")
+    assert "app-one\n  gone\n  preview-1" in result.output
+    assert "Deletion cancelled." in result.output
+    assert deleted == []
+
+    result = runner.invoke(cli, args, input="y\n")
+    assert result.exit_code == 1
+    assert result.output.count("Are you sure") == 1
+    assert sorted(deleted) == ["app-one", "gone", "preview-1"]
+    assert "Service 'gone' not deleted: not found in us-central1" in result.output
+    assert "Deleted 2 of 3 services" in result.output
+
+
+def test_services_create_ensure_only_fixes_what_is_missing(runner, monkeypatch):
+    from google.cloud import run_v2
+    from google.api_core import exceptions
+    from google.iam.v1 import policy_pb2
+    from cli import gcp
+
+    calls = []
+    missing = False
+
+    class FakeRun:
+        def get_service(self, name):
+            return run_v2.Service(
+                name=name,
+                uri="https://svc.run.app",
+                template=run_v2.RevisionTemplate(
+                    containers=[run_v2.Container(image=f"{image}:abc123")]
+                ),
+            )
+
+        def get_iam_policy(self, request):
+            return policy_pb2.Policy()
+
+        def set_iam_policy(self, request):
+            calls.append("set_iam_policy")
+            if missing:
+                raise exceptions.NotFound("service not ready")
+
+    class FakeBuild:
+        def get_build_trigger(self, project_id, trigger_id):
+            return manager.build_trigger(trigger_id.split("/")[-1])
+
+        def update_build_trigger(self, project_id, trigger_id, trigger):
+            calls.append("update_build_trigger")
+            return trigger
+
+        def run_build_trigger(self, request):
+            calls.append("run_build_trigger")
+            return types.SimpleNamespace(name="operations/build/p1/b-1")
+
+    class FakeClients:
+        project_id = "p1"
+        region = "us-central1"
+
+        def parent(self):
+            return "projects/p1/locations/us-central1"
+
+        def run(self):
+            return FakeRun()
+
+        def build(self):
+            return FakeBuild()
+
+    monkeypatch.setattr(gcp, "get_clients", lambda: FakeClients())
+    monkeypatch.setenv("GCP_SERVICE_ACCOUNT", "sa@p1.iam.gserviceaccount.com")
+    manager = gcp.CloudBuildTriggerManager(
+        FakeClients(), "peek-travel", "app", "sa@p1.iam.gserviceaccount.com"
+    )
+    image = manager.image
+    args = ["apps", "services", "create", "--repository", "peek-travel/app"]
+    args += ["--app-id", "a_1", "--ensure"]
+
+    # Trigger and image are current: only the missing IAM binding is added
+    result = runner.invoke(cli, args)
+    assert result.exit_code == 0, result.output
+    assert "Trigger: exists" in result.output
+    assert "Build: skip" in result.output
+    assert "Service is up to date" in result.output
+    assert calls == ["set_iam_policy"]
+
+    # A different cache mode changes the trigger, which is updated and rebuilt
+    calls.clear()
+    result = runner.invoke(cli, args + ["--build-cache", "registry", "--no-wait"])
+    assert result.exit_code == 0, result.output
+    assert "Trigger: update" in result.output
+    assert sorted(calls) == [
+        "run_build_trigger",
+        "set_iam_policy",
+        "update_build_trigger",
+    ]
+    assert "Build operation: operations/build/p1/b-1" in result.output
+
+    # With --no-wait, access that can't be granted yet is left to services wait
+    missing = True
+    result = runner.invoke(cli, args + ["--build-cache", "registry", "--no-wait"])
+    assert result.exit_code == 0, result.output
+    service = "projects/p1/locations/us-central1/services/a-1-app"
+    assert f"wait --grant-access {service} operations/build/p1/b-1" in result.output
+    assert f"Warning: {service} is not public yet" in result.output
+
+
+@responses.activate
+def test_rate_limit_backs_off_on_429(runner, monkeypatch):
+    from cli import ratelimit
+
+    monkeypatch.setattr(ratelimit, "_limiters", {})
+    monkeypatch.setattr("cli.utils.time.sleep", lambda seconds: None)
+    url = "http://noreaga.peek.stack/app-registry/api/apps/"
+    responses.add(responses.GET, url, status=429, headers={"Retry-After": "0"})
+    responses.add(responses.GET, url, json={"data": []}, status=200)
+
+    args = ["--api-token", "test_token", "--rate-limit", "registry=8", "-v"]
+    result = runner.invoke(cli, args + ["apps", "list"])
+    assert result.exit_code == 0, result.output
+    assert "Rate limited by registry:local; lowering rate to 4.00/s" in result.output
+    limiter = ratelimit._limiters["registry:local"]
+    assert limiter.rate == 4.4  # one success after the 429 adds back 8/20
+
+    result = runner.invoke(cli, ["--rate-limit", "nope=1", "apps", "list"])
+    assert result.exit_code == 2
+    assert "unknown target 'nope'" in result.output
+
+    # Pairs may be separated by commas, and by spaces in PEEK_RATE_LIMITS
+    monkeypatch.setenv("PEEK_RATE_LIMITS", "registry=5,run=2 build=1")
+    ctx = cli.make_context("peek", ["apps", "list"])
+    assert ctx.params["rate_limits"] == {"registry": 5.0, "run": 2.0, "build": 1.0}
+    ctx = cli.make_context("peek", ["--rate-limit", "registry=5,run=2", "apps"])
+    assert ctx.params["rate_limits"] == {"registry": 5.0, "run": 2.0}
+
+
+def test_operation_polls_are_gcp_calls():
+    import io
+    from cli import gcp
+    from cli.trace import Tracer
+
+    class FakeOperation:
+        def __init__(self, name):
+            self.name = name
+
+        def done(self):
+            return True
+
+        def result(self):
+            return self.name
+
+    stream = io.StringIO()
+    names = {
+        "svc": "projects/p/locations/r/operations/1",
+        "build": "operations/build/p/2",
+    }
+    with click.Context(click.Command("test"), obj={"TRACER": Tracer(stream)}):
+        results = gcp.run_operations(
+            lambda label: FakeOperation(names[label]), list(names), limit=2
+        )
+    assert {label: r["result"] for label, r in results.items()} == names
+    events = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert sorted(event["name"] for event in events) == [
+        "build.get_operation",
+        "run.get_operation",
+    ]
+
+
+def test_adaptive_token_bucket_recovers():
+    from cli.ratelimit import AdaptiveTokenBucket
+
+    bucket = AdaptiveTokenBucket(10)
+    for _ in range(5):
+        bucket.throttled()
+    assert bucket.rate == 1  # never below a tenth of the configured rate
+    for _ in range(30):
+        bucket.succeeded()
+    assert bucket.rate == 10
+
+
+@responses.activate
+def test_diff_reports_only_changed_entities(runner, monkeypatch):
+    monkeypatch.setenv("PEEK_API_TOKEN_PROD", "prod_token")
+    for base, apps, versions in [
+        (
+            ENVIRONMENTS["stage"],
+            [{"id": "a1", "name": "Same"}, {"id": "a2", "name": "New"}],
+            [
+                {
+                    "id": 7,
+                    "display_version": "1.0.0",
+                    "extendables": [
+                        {
+                            "id": 1,
+                            "slug": "hook",
+                            "inserted_at": "2024-01-01",
+                            "configuration": {"url": "https://stage"},
+                        },
+                        {"id": 2, "slug": "menu", "configuration": {}},
+                    ],
+                }
+            ],
+        ),
+        (
+            ENVIRONMENTS["prod"],
+            [{"id": "p1", "name": "Same", "updated_at": "later"}],
+            [
+                {
+                    "id": 9,
+                    "display_version": "1.0.0",
+                    "extendables": [
+                        {
+                            "id": 31,
+                            "slug": "menu",
+                            "updated_at": "2024-02-02",
+                            "configuration": {},
+                        },
+                        {
+                            "id": 30,
+                            "slug": "hook",
+                            "inserted_at": "2024-02-01",
+                            "configuration": {"url": "https://prod"},
+                        },
+                    ],
+                }
+            ],
+        ),
+    ]:
+        api = f"{base}/app-registry/api/apps/"
+        responses.add(responses.GET, api, json={"data": apps}, status=200)
+        for app in apps:
+            responses.add(
+                responses.GET,
+                f"{api}{app['id']}/versions/",
+                json={"data": versions},
+                status=200,
+            )
+
+    result = runner.invoke(
+        cli,
+        ["--api-token", "stage_token", "--output", "ndjson", "diff", "--exit-code"],
+    )
+    assert result.exit_code == 1, result.output
+    items = [json.loads(line) for line in result.output.splitlines()]
+    # Apps are paired by name, and ids and timestamps, which differ between
+    # environments at any depth, are not reported as changes
+    assert [(i["kind"], i["key"], i["change"]) for i in items] == [
+        ("apps", "New", "only in stage"),
+        ("versions", "New/1.0.0", "only in stage"),
+        ("versions", "Same/1.0.0", "changed"),
+    ]
+    assert items[2]["changes"] == [
+        {
+            "path": "extendables.hook.configuration.url",
+            "stage": "https://stage",
+            "prod": "https://prod",
+        }
+    ]
+    tokens = {
+        call.request.url.split("/app-registry")[0]: call.request.headers[
+            "Authorization"
+        ]
+        for call in responses.calls
+    }
+    assert tokens == {
+        ENVIRONMENTS["stage"]: "Bearer stage_token",
+        ENVIRONMENTS["prod"]: "Bearer prod_token",
+    }
+
+    # A stage id selects the app in prod too
+    result = runner.invoke(
+        cli,
+        ["--api-token", "stage_token", "--output", "ndjson", "diff"]
+        + ["--app-id", "a1"],
+    )
+    assert result.exit_code == 0, result.output
+    assert [json.loads(line)["key"] for line in result.output.splitlines()] == [
+        "Same/1.0.0"
+    ]